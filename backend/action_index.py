@@ -0,0 +1,114 @@
+# action_index.py - incremental play-by-play: what changed since a client's cursor
+#
+# Every refresh of a game's play-by-play that adds, edits or removes
+# actions gets the next revision number. A client keeps the cursor it
+# last saw (the "rev" of its previous response, "<epoch>:<revision>") and
+# asks for everything after it, so a client that is caught up gets nothing
+# back, whatever happened to old actions in the meantime.
+import bisect
+import secrets
+import threading
+from collections import OrderedDict
+
+class ActionIndex:
+    """
+    Ordered actions for one game, updated from each new upstream document.
+    Cursors carry a random epoch per index, so a cursor from another index
+    (another worker, a restart, an eviction) or from nowhere (0) never
+    matches and is answered with the full list and "reset": true.
+    """
+    def __init__(self):
+        self._actions = {}   # actionNumber -> action
+        self._order = []     # sorted actionNumbers
+        self._changes = []   # (rev, actionNumber) in rev order; removals included
+        self._source = None  # upstream document the index reflects
+        self.epoch = secrets.token_hex(4)
+        self.rev = 0
+        self.hwm = 0         # Highest actionNumber (informational)
+        self._lock = threading.Lock()
+
+    def update(self, data):
+        """Apply an upstream document. Returns False (and does nothing) when
+        it is the document already applied."""
+        with self._lock:
+            if data is self._source:
+                return False
+            changed, seen = [], set()
+            for action in ((data or {}).get("game") or {}).get("actions") or []:
+                num = action.get("actionNumber")
+                if num is None:
+                    continue
+                seen.add(num)
+                old = self._actions.get(num)
+                if old == action:
+                    continue
+                if old is None:
+                    bisect.insort(self._order, num)
+                self._actions[num] = action
+                changed.append(num)
+            if len(seen) != len(self._actions):
+                for num in [n for n in self._order if n not in seen]:
+                    del self._actions[num]
+                    changed.append(num)
+                self._order = sorted(self._actions)
+            if changed:
+                self.rev += 1
+                self._changes.extend((self.rev, num) for num in changed)
+                if len(self._changes) > 2 * len(self._actions) + 64:
+                    self._compact()
+            self.hwm = self._order[-1] if self._order else 0
+            self._source = data
+            return True
+
+    @property
+    def cursor(self):
+        """The current revision as a client cursor."""
+        return f"{self.epoch}:{self.rev}"
+
+    def _parse(self, cursor):
+        """Revision in a cursor from this index, else None."""
+        epoch, _, rev = str(cursor).partition(":")
+        if epoch != self.epoch or not rev.isdigit() or int(rev) > self.rev:
+            return None
+        return int(rev)
+
+    def _compact(self):
+        # Only the latest change per action matters to any cursor
+        latest = {}
+        for rev, num in self._changes:
+            latest[num] = rev
+        self._changes = sorted((rev, num) for num, rev in latest.items())
+
+    def since(self, after):
+        """Actions added or edited and actionNumbers removed after cursor
+        `after`, plus the cursor ("rev") to send next time."""
+        with self._lock:
+            rev = self._parse(after)
+            if rev is None:
+                return {"rev": self.cursor, "hwm": self.hwm, "reset": True,
+                        "actions": [self._actions[n] for n in self._order], "removed": []}
+            start = bisect.bisect_right(self._changes, (rev, float("inf")))
+            nums = sorted({num for _, num in self._changes[start:]})
+            return {
+                "rev": self.cursor,
+                "hwm": self.hwm,
+                "actions": [self._actions[n] for n in nums if n in self._actions],
+                "removed": [n for n in nums if n not in self._actions],
+            }
+
+class ActionIndexRegistry:
+    """One ActionIndex per game, least recently used games dropped first."""
+    def __init__(self, max_games=64):
+        self.max_games = max_games
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, game_id):
+        with self._lock:
+            index = self._indexes.get(game_id)
+            if index is None:
+                index = self._indexes[game_id] = ActionIndex()
+                if len(self._indexes) > self.max_games:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(game_id)
+            return index
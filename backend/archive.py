@@ -0,0 +1,120 @@
+# archive.py - write-once on-disk archive of final games' documents
+#
+# Once a game is final its boxscore/pbp never change, so a gzip copy is
+# kept on disk (one file per cache key) and served on cache misses instead
+# of going back to the CDN, across evictions, restarts and deploys.
+# gzip's CRC32 + length trailer is the integrity check: a truncated or
+# corrupted file fails to decompress and is deleted.
+import os
+import gzip
+import zlib
+import tempfile
+import threading
+
+import codec
+
+ARCHIVE_MAX_BYTES = int(os.environ.get("ARCHIVE_MAX_BYTES", 256 * 1024 * 1024))  # 0 disables
+SUFFIX = ".json.gz"
+
+class GameArchive:
+    """Files are written once and evicted least recently used first once
+    the directory holds more than max_bytes."""
+    def __init__(self, root, max_bytes=ARCHIVE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._files = {}  # key -> (size, last use)
+        self._bytes = 0
+        self._counts = {"hits": 0, "writes": 0, "corrupt": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            if name.endswith(SUFFIX):
+                st = os.stat(os.path.join(root, name))
+                self._files[name[:-len(SUFFIX)].replace("_", ":", 1)] = (st.st_size, st.st_mtime)
+                self._bytes += st.st_size
+
+    def _path(self, key):
+        return os.path.join(self.root, key.replace(":", "_", 1) + SUFFIX)
+
+    def _discard(self, key):
+        # Caller holds the lock
+        size, _ = self._files.pop(key, (0, 0))
+        self._bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _known(self, key):
+        """True if key is archived, picking up files other workers wrote."""
+        with self._lock:
+            if key in self._files:
+                return True
+            try:
+                st = os.stat(self._path(key))
+            except OSError:
+                return False
+            self._files[key] = (st.st_size, st.st_mtime)
+            self._bytes += st.st_size
+            return True
+
+    def get(self, key):
+        """Archived document for key, or None (missing or failed the check)."""
+        if not self._known(key):
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = codec.loads(gzip.decompress(f.read()))
+            os.utime(path)
+        except (OSError, EOFError, zlib.error, ValueError):
+            with self._lock:
+                self._counts["corrupt"] += 1
+                self._discard(key)
+            return None
+        with self._lock:
+            if key in self._files:
+                self._files[key] = (self._files[key][0], os.path.getmtime(path))
+            self._counts["hits"] += 1
+        return data
+
+    def put(self, key, data):
+        """Archive data under key unless it already is. Returns True if written."""
+        if self._known(key):
+            return False
+        blob = gzip.compress(codec.dumps(data), 6)
+        if len(blob) > self.max_bytes:
+            return False
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, self._path(key))  # Atomic; readers never see a partial file
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        with self._lock:
+            self._files[key] = (len(blob), os.path.getmtime(self._path(key)))
+            self._bytes += len(blob)
+            self._counts["writes"] += 1
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                oldest = min(self._files, key=lambda k: self._files[k][1])
+                self._discard(oldest)
+                self._counts["evicted"] += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {**self._counts, "files": len(self._files), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+def make_archive():
+    """GameArchive under ARCHIVE_DIR (the temp dir by default, which a deploy
+    wipes; render.yaml points it at the persistent disk), or None when
+    ARCHIVE_MAX_BYTES is 0."""
+    if ARCHIVE_MAX_BYTES <= 0:
+        return None
+    root = os.environ.get("ARCHIVE_DIR", os.path.join(tempfile.gettempdir(), "nba_archive"))
+    return GameArchive(root)
@@ -0,0 +1,148 @@
+# assets.py - local copies of team logos and player headshots
+#
+# Logos and headshots almost never change, so each one is fetched from the
+# CDN once, kept in a byte-budgeted LRU in memory and written to ASSET_DIR
+# so restarts don't refetch them. Every asset gets a strong ETag (hash of
+# its bytes). Copies older than max_age are refetched; 404s are remembered
+# for miss_ttl so missing headshots don't hit the CDN on every page view.
+# Also builds the team-logo sprite served at /assets/team-logos.svg.
+import os
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+
+ASSET_CACHE_BYTES = int(os.environ.get("ASSET_CACHE_BYTES", 32 * 1024 * 1024))
+ASSET_MAX_AGE = int(os.environ.get("ASSET_MAX_AGE", 7 * 24 * 3600))
+MISS_TTL = 3600
+
+CONTENT_TYPES = {".svg": "image/svg+xml", ".png": "image/png"}
+
+# body is None for an asset the CDN doesn't have
+Asset = namedtuple("Asset", "body content_type etag fetched")
+
+def make_asset(name, body, fetched=None):
+    etag = hashlib.sha256(body).hexdigest()[:16] if body is not None else None
+    content_type = CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+    return Asset(body, content_type, etag, fetched or time.time())
+
+def data_uri(asset):
+    return f"data:{asset.content_type};base64," + base64.b64encode(asset.body).decode()
+
+class AssetStore:
+    """
+    fetch(url) -> bytes, or None when the CDN has no such asset; raises
+    on any other failure. Names are file names ("logo_1610612737.svg").
+    """
+    def __init__(self, fetch, root=None, max_bytes=ASSET_CACHE_BYTES, max_age=ASSET_MAX_AGE, miss_ttl=MISS_TTL):
+        self.fetch = fetch
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.miss_ttl = miss_ttl
+        self._mem = OrderedDict()  # name -> Asset, least recently used first
+        self._bytes = 0
+        self._counts = {"hits": 0, "disk_hits": 0, "fetches": 0, "missing": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def _remember(self, name, asset):
+        size = len(asset.body or b"")
+        with self._lock:
+            old = self._mem.pop(name, None)
+            if old is not None:
+                self._bytes -= len(old.body or b"")
+            self._mem[name] = asset
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._mem) > 1:
+                _, evicted = self._mem.popitem(last=False)
+                self._bytes -= len(evicted.body or b"")
+                self._counts["evicted"] += 1
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, name):
+        """(asset, fresh) from memory or disk; (None, False) if not stored.
+        A stale asset is still returned, to serve if the refetch fails."""
+        with self._lock:
+            asset = self._mem.get(name)
+            if asset is not None:
+                self._mem.move_to_end(name)
+        if asset is None and self.root:
+            path = os.path.join(self.root, name)
+            try:
+                with open(path, "rb") as f:
+                    asset = make_asset(name, f.read(), os.path.getmtime(path))
+            except OSError:
+                return None, False
+            self._remember(name, asset)
+            self._count("disk_hits")
+        if asset is None:
+            return None, False
+        ttl = self.max_age if asset.body is not None else self.miss_ttl
+        fresh = time.time() - asset.fetched < ttl
+        if fresh:
+            self._count("hits")
+        return asset, fresh
+
+    def load(self, name, url):
+        """Fetch name from url and store it. Returns the Asset."""
+        body = self.fetch(url)
+        self._count("fetches" if body is not None else "missing")
+        asset = make_asset(name, body)
+        self._remember(name, asset)
+        if body is not None and self.root:
+            self._write(name, body)
+        return asset
+
+    def _write(self, name, body):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp, os.path.join(self.root, name))  # Atomic; readers never see a partial file
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {**self._counts, "entries": len(self._mem), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "dir": self.root}
+
+def make_asset_store(fetch):
+    """AssetStore under ASSET_DIR (memory only when ASSET_DIR is empty)."""
+    root = os.environ.get("ASSET_DIR", os.path.join(tempfile.gettempdir(), "nba_assets"))
+    return AssetStore(fetch, root or None)
+
+# ---------------- Team-logo sprite ----------------
+# One SVG holding every logo in a grid, each cell addressable with an SVG
+# fragment view: <img src="/assets/team-logos.svg#team-1610612737"> shows
+# just that team, so a page of game cards needs one logo request in total.
+# Logos are embedded as data: images rather than inlined, so ids, classes
+# and <style> rules inside different logos can't collide.
+SPRITE_CELL = 100
+SPRITE_COLUMNS = 6
+
+def build_logo_sprite(logos):
+    """logos: [(team_id, Asset or None)] in a fixed order. Returns SVG bytes;
+    a team without an asset keeps its (empty) cell and view."""
+    rows = (len(logos) + SPRITE_COLUMNS - 1) // SPRITE_COLUMNS
+    width, height = SPRITE_COLUMNS * SPRITE_CELL, rows * SPRITE_CELL
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+             f'width="{width}" height="{height}">']
+    for i, (team_id, asset) in enumerate(logos):
+        x, y = (i % SPRITE_COLUMNS) * SPRITE_CELL, (i // SPRITE_COLUMNS) * SPRITE_CELL
+        parts.append(f'<view id="team-{team_id}" viewBox="{x} {y} {SPRITE_CELL} {SPRITE_CELL}"/>')
+        if asset is not None and asset.body is not None:
+            parts.append(f'<image x="{x}" y="{y}" width="{SPRITE_CELL}" height="{SPRITE_CELL}" '
+                         f'href="{data_uri(asset)}"/>')
+    parts.append("</svg>")
+    return "".join(parts).encode()
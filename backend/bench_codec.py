@@ -0,0 +1,66 @@
+# bench_codec.py - JSON decode/encode throughput on the _api_dumps fixtures
+#
+# Compares the stdlib codec with orjson (when installed) on the operations
+# the server runs per upstream change or per request:
+#   decode        r.content -> dict        (fetch_json_throttled)
+#   encode        dict -> compact bytes    (response bodies, jsonify)
+#   encode_sorted dict -> sorted bytes     (stable_hash ETags)
+#   python bench_codec.py [seconds_per_case]
+import sys
+import json
+import time
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DUMPS = Path(__file__).parent / "_api_dumps"
+FIXTURES = ["pbp_0022400554.json", "boxscore_0022400554.json"]
+
+CODECS = {
+    "json": {
+        "decode": json.loads,
+        "encode": lambda o: json.dumps(o, separators=(",", ":"), ensure_ascii=False).encode(),
+        "encode_sorted": lambda o: json.dumps(o, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode(),
+    },
+}
+if orjson is not None:
+    CODECS["orjson"] = {
+        "decode": orjson.loads,
+        "encode": orjson.dumps,
+        "encode_sorted": lambda o: orjson.dumps(o, option=orjson.OPT_SORT_KEYS),
+    }
+
+def run(fn, arg, seconds):
+    """Average ms per call over roughly `seconds` of wall time."""
+    fn(arg)  # Warm-up
+    n, start = 0, time.perf_counter()
+    while True:
+        fn(arg)
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed * 1000 / n
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    if orjson is None:
+        print("(orjson not installed: only the stdlib codec is measured)")
+    print(f"{'fixture':<26} {'op':<14} " + " ".join(f"{name + ' ms':>10} {name + ' MB/s':>12}" for name in CODECS))
+    for fixture in FIXTURES:
+        raw = (DUMPS / fixture).read_bytes()
+        obj = json.loads(raw)
+        compact_mb = len(CODECS["json"]["encode"](obj)) / 1e6
+        for op in ("decode", "encode", "encode_sorted"):
+            arg = raw if op == "decode" else obj
+            size_mb = len(raw) / 1e6 if op == "decode" else compact_mb
+            cells = []
+            for name, ops in CODECS.items():
+                ms = run(ops[op], arg, seconds)
+                cells.append(f"{ms:>10.3f} {size_mb / (ms / 1000):>12.1f}")
+            print(f"{fixture:<26} {op:<14} " + " ".join(cells))
+
+if __name__ == "__main__":
+    main()
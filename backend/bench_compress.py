@@ -0,0 +1,56 @@
+# bench_compress.py - CPU per request for large game payloads, before/after pre-compression
+#
+# Runs fully offline: the _api_dumps fixtures are loaded straight into the
+# server cache as final games, so no request goes upstream.
+#   python bench_compress.py [requests_per_case]
+import os
+import sys
+import json
+import time
+from pathlib import Path
+
+from flask import jsonify
+
+os.environ.setdefault("WARM_START", "0")  # Keep the restored snapshot/warm-up out of the numbers
+import server
+
+DUMPS = Path(__file__).parent / "_api_dumps"
+GAME_ID = "0022400554"
+FIXTURES = {
+    "boxscore": (f"box:{GAME_ID}", DUMPS / f"boxscore_{GAME_ID}.json"),
+    "pbp": (f"pbp:{GAME_ID}", DUMPS / f"pbp_{GAME_ID}.json"),
+}
+
+# The old request path: jsonify the cached dict, flask-compress compresses it every time
+@server.app.get("/_bench/legacy/<kind>")
+def legacy(kind):
+    return jsonify(server.cache_get(FIXTURES[kind][0], ttl=3600))
+
+def measure(client, path, encoding, n):
+    """Average CPU ms and response bytes per request."""
+    headers = {"Accept-Encoding": encoding}
+    r = client.get(path, headers=headers)  # Warm-up (builds the cached variants)
+    assert r.status_code == 200, (path, r.status_code)
+    start = time.process_time()
+    for _ in range(n):
+        r = client.get(path, headers=headers)
+    cpu_ms = (time.process_time() - start) * 1000 / n
+    return cpu_ms, len(r.data), r.headers.get("Content-Encoding") or "identity"
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for key, path in FIXTURES.values():
+        with path.open(encoding="utf-8") as f:
+            server.cache_set(key, json.load(f), is_final=True)
+
+    client = server.app.test_client()
+    print(f"=== CPU per request, {n} requests per case ===")
+    print(f"{'route':<10} {'encoding':<9} {'before ms':>10} {'after ms':>9} {'speedup':>8} {'bytes before':>13} {'bytes after':>12}")
+    for kind in FIXTURES:
+        for encoding in ("br", "gzip", "identity"):
+            b_ms, b_bytes, _ = measure(client, f"/_bench/legacy/{kind}", encoding, n)
+            a_ms, a_bytes, used = measure(client, f"/game/{GAME_ID}/{kind}", encoding, n)
+            print(f"{kind:<10} {used:<9} {b_ms:>10.2f} {a_ms:>9.2f} {b_ms / a_ms:>7.1f}x {b_bytes:>13} {a_bytes:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# bench_load.py - offline load test of every server.py route against fake_cdn.py
+#
+# Starts the fake CDN and the Flask app (threaded werkzeug server) in this
+# process, then hammers one route at a time from --concurrency client
+# threads for --duration seconds each. Every route starts from an empty
+# cache, so the numbers include the cold fill. /stream is left out (one
+# request never ends).
+#   python bench_load.py [--duration 5] [--concurrency 16] [--latency 40] [--error-rate 0.02] [--routes boxscore,pbp]
+import os
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import quote
+
+import requests
+from werkzeug.serving import make_server
+
+import fake_cdn
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+def run_route(url, duration, concurrency):
+    """Returns (latencies_ms sorted, errors)."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                r = session.get(url, timeout=30, allow_redirects=False)
+                _ = r.content
+                failed += r.status_code >= 500
+            except requests.RequestException:
+                failed += 1
+            mine.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies), errors[0]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--duration", type=float, default=5)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--games", type=int, default=12)
+    ap.add_argument("--latency", type=float, default=40, help="fake CDN latency, ms")
+    ap.add_argument("--jitter", type=float, default=10)
+    ap.add_argument("--error-rate", type=float, default=0)
+    ap.add_argument("--throttle-rate", type=float, default=0)
+    ap.add_argument("--routes", default="", help="comma-separated route names (default: all)")
+    args = ap.parse_args()
+
+    cdn = fake_cdn.FakeCDN(games=args.games, latency_ms=args.latency, jitter_ms=args.jitter,
+                           error_rate=args.error_rate, throttle_rate=args.throttle_rate, seed=1)
+    _, cdn_base = fake_cdn.start(cdn)
+    # Configure the app before importing it: fake upstream, no disk state, no background work
+    os.environ["NBA_CDN_BASE"] = cdn_base
+    os.environ.setdefault("WARM_START", "0")
+    os.environ.setdefault("ARCHIVE_MAX_BYTES", "0")
+    os.environ.setdefault("ASSET_DIR", "")
+    os.environ.setdefault("PREFETCH", "0")
+    import server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # No per-request access log
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    api = f"http://127.0.0.1:{httpd.server_port}"
+
+    now = time.time()
+    live = next(g for g in cdn.synthetic if 0.2 < cdn.progress(g, now) < 0.8)
+    team_id = cdn.box["game"]["homeTeam"]["teamId"]
+    today = time.strftime("%Y-%m-%d", time.gmtime(now))
+    routes = {
+        "health": "/health",
+        "scoreboard": "/scoreboard",
+        "scoreboard_date": f"/scoreboard?date={today}",
+        "scoreboard_cards": f"/scoreboard?date={today}&cards=1",
+        "schedule_team": f"/schedule/team/{team_id}",
+        "schedule_game": f"/schedule/game/{live}",
+        "boxscore": f"/game/{live}/boxscore",
+        "boxscore_final": f"/game/{fake_cdn.FIXTURE_GAME}/boxscore",
+        "boxscore_fields": f"/game/{live}/boxscore?fields=" + quote("game.homeTeam.players.statistics.points"),
+        "pbp": f"/game/{live}/pbp",
+        "pbp_after": f"/game/{live}/pbp?after=100",
+        "dashboard": f"/game/{live}/dashboard",
+        "poll": f"/poll/game/{live}",
+        "batch": "/games/batch?ids=" + ",".join(cdn.synthetic),
+        "team_logo": f"/assets/team-logo/{team_id}",
+        "logo_sprite": "/assets/team-logos.svg",
+        "headshots": f"/assets/player-headshots?game={live}",
+    }
+    if args.routes:
+        routes = {name: routes[name] for name in args.routes.split(",")}
+
+    print(f"=== {args.concurrency} clients x {args.duration:g}s per route, CDN latency "
+          f"{args.latency:g}±{args.jitter:g} ms, 5xx {args.error_rate:g}, 429 {args.throttle_rate:g} ===")
+    print(f"{'route':<17} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'upstream':>9}")
+    for name, path in routes.items():
+        server.CACHE = server.make_cache()  # Cold start for every route
+        server.ASSETS = server.make_asset_store(server._fetch_asset)
+        cdn.reset()
+        lat, errors = run_route(api + path, args.duration, args.concurrency)
+        upstream = cdn.stats()["total"]
+        print(f"{name:<17} {len(lat):>8} {len(lat) / args.duration:>8.0f} {percentile(lat, 50):>8.1f} "
+              f"{percentile(lat, 95):>8.1f} {percentile(lat, 99):>8.1f} {errors:>7} {upstream:>9}")
+    httpd.shutdown()
+
+if __name__ == "__main__":
+    main()
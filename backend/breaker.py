@@ -0,0 +1,161 @@
+# breaker.py - circuit breakers and a request budget for the upstream CDN
+#
+# When cdn.nba.com starts answering 429/5xx, retrying every request makes
+# it worse. Each key family (box, pbp, scoreboard, schedule) has a breaker:
+# after `failures` consecutive failures it opens and calls are refused
+# without touching the network for `cooldown` seconds (longer if the CDN
+# sent Retry-After). Then one probe is let through: success closes the
+# breaker, failure opens it again with a doubled cooldown. A token bucket
+# caps the total upstream request rate on top of that; callers wait their
+# turn for a token (up to a limit) instead of being refused outright.
+import time
+import threading
+
+from prefetch import TokenBucket
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised instead of calling the CDN (breaker open or over budget)."""
+
+class CircuitBreaker:
+    def __init__(self, failures=5, cooldown=15.0, max_cooldown=120.0):
+        self.failures = failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.consecutive = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self.retry_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        self.opens = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go upstream now. In half-open state only one
+        probe is in flight at a time."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive = 0
+            self.cooldown = self.base_cooldown
+            self.probing = False
+
+    def failure(self, retry_after=None):
+        with self._lock:
+            self.consecutive += 1
+            if self.state == OPEN:
+                return  # A call that was already in flight when the breaker opened
+            if self.state == HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.consecutive < self.failures:
+                return
+            self.state = OPEN
+            self.opens += 1
+            self.probing = False
+            self.opened_at = time.monotonic()
+            self.retry_at = self.opened_at + max(self.cooldown, min(retry_after or 0, self.max_cooldown))
+
+    def release_probe(self):
+        """Give back a half-open probe slot that was never used."""
+        with self._lock:
+            self.probing = False
+
+    def stats(self):
+        with self._lock:
+            out = {"state": self.state, "consecutive_failures": self.consecutive,
+                   "opens": self.opens, "rejected": self.rejected}
+            if self.state != CLOSED:
+                out["retry_in"] = round(max(0.0, self.retry_at - time.monotonic()), 1)
+        return out
+
+class UpstreamGuard:
+    """One breaker per family plus a shared token bucket (`rate` requests/s,
+    bursts up to `burst`). Families in `budgets` ({family: (rate, burst)})
+    get a bucket of their own instead, so e.g. a burst of image fetches
+    can't use up the budget of the live data feeds."""
+    def __init__(self, rate=20.0, burst=40, failures=5, cooldown=15.0, budgets=None):
+        self.bucket = TokenBucket(rate, burst)
+        self.buckets = {family: TokenBucket(r, b) for family, (r, b) in (budgets or {}).items()}
+        self.failures = failures
+        self.cooldown = cooldown
+        self.throttled = 0  # Refused: no token within the caller's wait
+        self.delayed = 0    # Queued for a token instead of going out at once
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, family):
+        with self._lock:
+            b = self._breakers.get(family)
+            if b is None:
+                b = self._breakers[family] = CircuitBreaker(self.failures, self.cooldown)
+            return b
+
+    def reserve(self, family, wait=0.0):
+        """Seconds until a request for family may go out (0 = now); raise
+        UpstreamUnavailable if the breaker is open or the budget won't have
+        a token for it within `wait` seconds."""
+        if not self.breaker(family).allow():
+            raise UpstreamUnavailable(f"circuit open for {family}")
+        delay = self.buckets.get(family, self.bucket).reserve(1, wait)
+        if delay is None:
+            with self._lock:
+                self.throttled += 1
+            # Not the CDN's fault: leave the breaker alone, but free a half-open probe slot
+            self.breaker(family).release_probe()
+            raise UpstreamUnavailable("upstream request budget exhausted")
+        if delay:
+            with self._lock:
+                self.delayed += 1
+        return delay
+
+    def acquire(self, family, wait=0.0):
+        """reserve(), then sleep until the request may go out. Returns the
+        seconds slept."""
+        delay = self.reserve(family, wait)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def record(self, family, status, retry_after=None):
+        """Feed an outcome to family's breaker: an HTTP status, or None for a
+        network error/timeout. 429 and 5xx count as failures; 403/404 don't."""
+        if status is None or status == 429 or status >= 500:
+            self.breaker(family).failure(retry_after)
+        else:
+            self.breaker(family).success()
+
+    def states(self):
+        """{family: 0 closed / 1 half-open / 2 open} (for metrics)."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        codes = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+        return {family: codes[b.state] for family, b in breakers.items()}
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            throttled, delayed = self.throttled, self.delayed
+        return {"breakers": {family: b.stats() for family, b in sorted(breakers.items())},
+                "throttled": throttled, "delayed": delayed, "rate": self.bucket.rate, "burst": self.bucket.capacity}
+
+def retry_after_seconds(value):
+    """Retry-After as seconds (the HTTP-date form is ignored)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,402 @@
+# cache_backends.py - In-process and shared cache backends for server.py
+import os
+import sys
+import time
+import json
+import uuid
+import sqlite3
+import tempfile
+import threading
+import itertools
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import codec
+
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 128 * 1024 * 1024))
+CACHE_MAX_AGE = int(os.environ.get("CACHE_MAX_AGE", 7200))  # Entries older than 2 hours are dropped
+
+def estimate_size(obj):
+    """Approximate in-memory footprint of a parsed JSON document, in bytes."""
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple)):
+            stack.extend(o)
+    return size
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache with a memory budget.
+    Entries for live games sit in a priority segment that is only evicted
+    once every other entry is gone. Expired entries are removed lazily on
+    access and by a small sweep on each write, never by a full scan.
+    """
+    SWEEP_BATCH = 8
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lru = OrderedDict()   # key -> entry, least recently used first
+        self._live = OrderedDict()  # same, for live games (evicted last)
+        self._bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
+        self._versions = itertools.count(1)  # Local versions when the caller has none
+        self._lock = threading.Lock()
+
+    # -- internal helpers (caller holds the lock) --
+    def _find(self, key):
+        for seg in (self._live, self._lru):
+            entry = seg.get(key)
+            if entry is not None:
+                return seg, entry
+        return None, None
+
+    def _remove(self, seg, key):
+        entry = seg.pop(key)
+        self._bytes -= entry["size"]
+        return entry
+
+    def _entry(self, key):
+        """Live entry for key (marked recently used), dropping it if expired."""
+        seg, entry = self._find(key)
+        if entry is None:
+            return None
+        if time.time() - entry["ts"] > self.max_age:
+            self._remove(seg, key)
+            self._expirations += 1
+            return None
+        seg.move_to_end(key)
+        return entry
+
+    def _sweep(self):
+        now = time.time()
+        for seg in (self._lru, self._live):
+            for key in list(itertools.islice(seg, self.SWEEP_BATCH)):
+                if now - seg[key]["ts"] > self.max_age:
+                    self._remove(seg, key)
+                    self._expirations += 1
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            seg = self._lru if self._lru else self._live
+            if not seg:
+                break
+            self._remove(seg, next(iter(seg)))
+            self._evictions += 1
+
+    # -- public API --
+    def get(self, key, ttl):
+        with self._lock:
+            entry = self._entry(key)
+            if entry and (time.time() - entry["ts"] < ttl):
+                return entry["data"]
+            return None
+
+    def lookup(self, key, soft_ttl, hard_ttl):
+        """Return (data, state): "fresh" inside soft_ttl, "stale" between
+        soft_ttl and hard_ttl, (None, None) past hard_ttl or when missing."""
+        with self._lock:
+            entry = self._entry(key)
+            if not entry:
+                return None, None
+            age = time.time() - entry["ts"]
+            if age < soft_ttl:
+                return entry["data"], "fresh"
+            if age < hard_ttl:
+                return entry["data"], "stale"
+            return None, None
+    
+    def set(self, key, data, is_final=False, validators=None, live=False,
+            local=False, ts=None, version=None):
+        size = estimate_size(data)  # Outside the lock; walks the whole document
+        with self._lock:
+            seg, _ = self._find(key)
+            if seg is not None:
+                self._remove(seg, key)
+            if size > self.max_bytes:
+                self._rejected += 1
+                return
+            # Final games get longer cache (1 hour)
+            entry = {
+                "data": data, 
+                "ts": ts or time.time(),
+                "final": is_final,
+                "validators": validators or {},
+                "size": size,
+                "version": version or f"m{next(self._versions)}",
+                "live": live,
+                "local": local,
+                "derived": {},
+            }
+            (self._live if live else self._lru)[key] = entry
+            self._bytes += size
+            self._sweep()
+            self._evict()
+
+    def export(self):
+        """Plain copies of every unexpired, serializable entry (for snapshots),
+        least recently used first so a restore keeps the same LRU order."""
+        now = time.time()
+        with self._lock:
+            return [
+                {"key": key, "data": e["data"], "ts": e["ts"], "final": e["final"],
+                 "live": e["live"], "validators": e["validators"]}
+                for seg in (self._lru, self._live)
+                for key, e in seg.items()
+                if not e["local"] and now - e["ts"] <= self.max_age
+            ]
+
+    def validators(self, key):
+        """Upstream ETag/Last-Modified for key, even if the entry is past its TTL."""
+        with self._lock:
+            entry = self._entry(key)
+            return dict(entry["validators"]) if entry else {}
+
+    def touch(self, key, ts=None):
+        """Mark an entry as freshly revalidated. Returns its data or None."""
+        with self._lock:
+            entry = self._entry(key)
+            if not entry:
+                return None
+            entry["ts"] = ts or time.time()
+            return entry["data"]
+
+    def derived(self, key, name, build):
+        """
+        Value computed from key's current data by build(data), memoized on
+        the entry: it is built once per upstream version and reused until
+        the entry is replaced (a 304 revalidation keeps it). Returns None
+        when key isn't cached.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            if entry is None:
+                return None
+            if name in entry["derived"]:
+                return entry["derived"][name]
+            data = entry["data"]
+        value = build(data)  # Outside the lock; may serialize a large document
+        size = estimate_size(value)
+        with self._lock:
+            seg, current = self._find(key)
+            if current is entry and name not in entry["derived"]:
+                entry["derived"][name] = value
+                entry["size"] += size
+                self._bytes += size
+                self._evict()
+        return value
+
+    def stamp(self, key):
+        """(ts, version) of the entry for key, or (0, None) when missing."""
+        with self._lock:
+            seg, entry = self._find(key)
+            return (entry["ts"], entry["version"]) if entry else (0, None)
+
+    @contextmanager
+    def lease(self, key, ttl=15):
+        """Cross-process fetch lease; a single process always owns it."""
+        yield True
+
+    def wait_for(self, key, ttl, timeout=10):
+        return None
+    
+    def is_final(self, key):
+        """True when key holds a final game"""
+        with self._lock:
+            entry = self._entry(key)
+            if entry:
+                return entry.get("final", False)
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._lru) + len(self._live),
+                "live_entries": len(self._live),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "utilization": round(self._bytes / self.max_bytes, 4) if self.max_bytes else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "rejected": self._rejected,
+                "backend": "memory",
+            }
+
+class SQLiteCache:
+    """
+    Cache shared by every worker process on the host.
+    Each process keeps a BoundedCache in front of a SQLite (WAL) file that
+    holds the serialized documents. Lookups compare the local copy's
+    version with the shared row and only re-decode when another worker
+    stored something newer; a 304 revalidation elsewhere just moves the
+    timestamp. Fetch leases let one worker go upstream while the others
+    wait for its result.
+    """
+    PRUNE_EVERY = 200  # writes between sweeps of expired rows
+
+    def __init__(self, path, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._local = BoundedCache(max_bytes=max_bytes, max_age=max_age)
+        self._tls = threading.local()
+        self._writes = 0
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, data BLOB NOT NULL, ts REAL NOT NULL,"
+            " final INTEGER NOT NULL, live INTEGER NOT NULL,"
+            " validators TEXT NOT NULL, version TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._tls.conn = conn
+        return conn
+
+    def _sync(self, key):
+        """Pull a newer shared copy of key into the local cache."""
+        ts, version = self._local.stamp(key)
+        row = self._conn().execute(
+            "SELECT ts, version FROM entries WHERE key=?", (key,)
+        ).fetchone()
+        if row is None or row[0] <= ts:
+            return
+        if row[1] == version:
+            self._local.touch(key, ts=row[0])
+            return
+        row = self._conn().execute(
+            "SELECT data, ts, final, live, validators, version FROM entries WHERE key=?", (key,)
+        ).fetchone()
+        if row is None:
+            return
+        data, ts, final, live, validators, version = row
+        self._local.set(key, codec.loads(data), bool(final), json.loads(validators),
+                        bool(live), ts=ts, version=version)
+
+    def get(self, key, ttl):
+        self._sync(key)
+        return self._local.get(key, ttl)
+
+    def lookup(self, key, soft_ttl, hard_ttl):
+        self._sync(key)
+        return self._local.lookup(key, soft_ttl, hard_ttl)
+
+    def set(self, key, data, is_final=False, validators=None, live=False,
+            local=False, ts=None, version=None):
+        """Store key; local=True keeps it in this process only (e.g. derived
+        structures that don't serialize to JSON)."""
+        ts = ts or time.time()
+        version = version or uuid.uuid4().hex
+        self._local.set(key, data, is_final, validators, live, local, ts=ts, version=version)
+        if local:
+            return
+        blob = codec.dumps(data)
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, data, ts, final, live, validators, version)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, blob, ts, int(is_final), int(live), json.dumps(validators or {}), version),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            now = time.time()
+            conn.execute("DELETE FROM entries WHERE ts < ?", (now - self.max_age,))
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+
+    def validators(self, key):
+        self._sync(key)
+        return self._local.validators(key)
+
+    def touch(self, key, ts=None):
+        ts = ts or time.time()
+        data = self._local.touch(key, ts=ts)
+        if data is not None:
+            self._conn().execute("UPDATE entries SET ts=? WHERE key=?", (ts, key))
+        return data
+
+    def export(self):
+        return self._local.export()
+
+    def is_final(self, key):
+        self._sync(key)
+        return self._local.is_final(key)
+
+    def stamp(self, key):
+        self._sync(key)
+        return self._local.stamp(key)
+
+    def derived(self, key, name, build):
+        self._sync(key)
+        return self._local.derived(key, name, build)
+
+    @contextmanager
+    def lease(self, key, ttl=15):
+        """Yield True if this process should fetch key, False if another
+        worker already holds the lease. Leases expire after ttl seconds so
+        a crashed worker can't block a key."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM leases WHERE key=? AND expires<?", (key, now))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+            (key, self._owner, now + ttl),
+        )
+        owner = cur.rowcount == 1
+        try:
+            yield owner
+        finally:
+            if owner:
+                conn.execute("DELETE FROM leases WHERE key=? AND owner=?", (key, self._owner))
+
+    def wait_for(self, key, ttl, timeout=10):
+        """Poll until another worker stores a fresh copy of key, or give up."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            data = self.get(key, ttl)
+            if data is not None:
+                return data
+            time.sleep(0.05)
+        return None
+
+    def stats(self):
+        out = self._local.stats()
+        count, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM entries"
+        ).fetchone()
+        out.update({"backend": "sqlite", "path": self.path,
+                    "shared_entries": count, "shared_bytes": size})
+        return out
+
+def make_cache():
+    """Build the cache selected by CACHE_BACKEND (memory | sqlite)."""
+    backend = os.environ.get("CACHE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        path = os.environ.get(
+            "CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "nba_cache.sqlite3")
+        )
+        return SQLiteCache(path)
+    if backend != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+    return BoundedCache()
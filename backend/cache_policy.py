@@ -0,0 +1,72 @@
+# cache_policy.py - cache lifetimes by game state
+#
+# One table decides, for every route serving a game, how long the server
+# keeps a copy (ttl + stale_ttl), how urgently the prefetcher refreshes it
+# (priority, lower first) and what Cache-Control clients get. The state
+# comes from the boxscore's gameStatus / gameStatusText / gameClock / period.
+import re
+import datetime as dt
+from collections import namedtuple
+
+Policy = namedtuple("Policy", "state ttl stale_ttl priority cache_control")
+
+POLICIES = {
+    "live":      Policy("live", 10, 20, 0, "public, max-age=8, stale-while-revalidate=20"),
+    "break":     Policy("break", 20, 20, 1, "public, max-age=15, stale-while-revalidate=20"),
+    "halftime":  Policy("halftime", 30, 30, 2, "public, max-age=20, stale-while-revalidate=30"),
+    "tipoff":    Policy("tipoff", 15, 20, 1, "public, max-age=10, stale-while-revalidate=20"),
+    "pregame":   Policy("pregame", 120, 60, 3, "public, max-age=60, stale-while-revalidate=60"),
+    "postponed": Policy("postponed", 900, 300, 4, "public, max-age=300"),
+    # Nothing changes after the final buzzer (the store's CACHE_MAX_AGE still
+    # bounds how long the server keeps it)
+    "final":     Policy("final", 24 * 3600, 0, 5, "public, max-age=86400, immutable"),
+}
+DEFAULT = POLICIES["live"]  # Unknown shape: assume it can change any second
+
+TIPOFF_LEAD = dt.timedelta(minutes=15)
+_CLOCK = re.compile(r"PT(\d+)M([\d.]+)S")
+_POSTPONED = ("ppd", "postpone", "cancel", "susp")
+
+def game_facts(data):
+    """The few boxscore fields the policy reads (small enough to memoize)."""
+    game = (data or {}).get("game") or {}
+    period = game.get("period")
+    return {
+        "status": game.get("gameStatus"),
+        "text": (game.get("gameStatusText") or "").strip().lower(),
+        "clock": game.get("gameClock"),
+        "period": period.get("current") if isinstance(period, dict) else period,
+        "tip": game.get("gameTimeUTC"),
+    }
+
+def clock_seconds(clock):
+    m = _CLOCK.fullmatch(clock or "")
+    return int(m.group(1)) * 60 + float(m.group(2)) if m else None
+
+def game_state(facts, now=None):
+    """live / break / halftime / tipoff / pregame / postponed / final, or None."""
+    status, text = facts["status"], facts["text"]
+    if status == 3 or text.startswith("final"):
+        return "final"
+    if any(word in text for word in _POSTPONED):
+        return "postponed"
+    if status == 2:
+        if text.startswith("half"):
+            return "halftime"
+        if clock_seconds(facts["clock"]) == 0:  # Between periods ("End of Q1")
+            return "halftime" if facts["period"] == 2 else "break"
+        return "live"
+    if status == 1:
+        try:
+            tip = dt.datetime.strptime(facts["tip"] or "", "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc)
+        except ValueError:
+            return "pregame"
+        now = now or dt.datetime.now(dt.timezone.utc)
+        return "tipoff" if tip - now <= TIPOFF_LEAD else "pregame"
+    return None
+
+def policy_for(facts, now=None):
+    """Policy for a game's facts (DEFAULT when the state is unknown)."""
+    if facts is None:
+        return DEFAULT
+    return POLICIES.get(game_state(facts, now), DEFAULT)
@@ -0,0 +1,37 @@
+# codec.py - JSON encode/decode for the hot paths (orjson when installed, stdlib otherwise)
+#
+# Both backends produce the same compact UTF-8 bytes for NBA payloads, so
+# ETags hashed from dumps_sorted() agree between workers with and without orjson.
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; everything works with the stdlib codec
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    def loads(raw):
+        """Parse JSON from bytes or str."""
+        return orjson.loads(raw)
+
+    def dumps(obj, default=None):
+        """Compact JSON as UTF-8 bytes."""
+        return orjson.dumps(obj, default=default)
+
+    def dumps_sorted(obj):
+        """Compact JSON with sorted keys (stable input for hashing)."""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+else:
+    def loads(raw):
+        """Parse JSON from bytes or str."""
+        return json.loads(raw)
+
+    def dumps(obj, default=None):
+        """Compact JSON as UTF-8 bytes."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=default).encode()
+
+    def dumps_sorted(obj):
+        """Compact JSON with sorted keys (stable input for hashing)."""
+        return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
@@ -0,0 +1,295 @@
+# fake_cdn.py - offline stand-in for cdn.nba.com, built from the _api_dumps fixtures
+#
+# Serves the liveData/staticData paths server.py reads, so the backend can be
+# run and load-tested without the network:
+#   python fake_cdn.py --port 8001 --games 12 --latency 40 --error-rate 0.02
+#   NBA_CDN_BASE=http://127.0.0.1:8001 python server.py
+# Besides the fixture game (final) it invents `--games` synthetic games on
+# today's date, spread from pregame to final, that progress over
+# `--game-seconds`: clock, period, scores, player stats and play-by-play move
+# every `--tick` seconds. Team logos and headshots are simple placeholder
+# images. Responses carry ETags and honour If-None-Match.
+# GET /_stats returns request counts; GET /_reset clears them.
+import copy
+import json
+import zlib
+import struct
+import time
+import random
+import hashlib
+import argparse
+import threading
+import datetime as dt
+from pathlib import Path
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DUMPS = Path(__file__).parent / "_api_dumps"
+FIXTURE_GAME = "0022400554"
+FIXTURE_DATE = "01/14/2025 00:00:00"
+LIVE_PREFIX = "/static/json/liveData/"
+SCHEDULE_PREFIX = "/static/json/staticData/scheduleLeagueV2_"
+LOGO_PREFIX = "/logos/nba/"
+HEADSHOT_PREFIX = "/headshots/nba/latest/"
+SCALED_STATS = ("points", "reboundsTotal", "assists", "fieldGoalsMade", "fieldGoalsAttempted")
+CONTENT_TYPES = {".json": "application/json", ".svg": "image/svg+xml", ".png": "image/png"}
+
+def placeholder_logo(team_id):
+    hue = int(team_id) % 360
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+            f'<circle cx="50" cy="50" r="46" fill="hsl({hue},60%,45%)"/>'
+            f'<text x="50" y="58" font-size="24" text-anchor="middle" fill="#fff">{str(team_id)[-2:]}</text>'
+            f'</svg>').encode()
+
+def placeholder_headshot(player_id, width=26, height=19):
+    """A flat-colored PNG (a tenth of the real 260x190)."""
+    shade = bytes(((int(player_id) * 37) % 256, 90, 140))
+    raw = b"".join(b"\x00" + shade * width for _ in range(height))
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+class FakeCDN:
+    def __init__(self, games=12, game_seconds=600.0, tick=3.0, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, throttle_rate=0.0, schedule_version=3, seed=None):
+        self.games = games
+        self.game_seconds = game_seconds
+        self.tick = tick
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.schedule_version = schedule_version
+        self.random = random.Random(seed)
+        self.t0 = time.time()
+        with (DUMPS / f"boxscore_{FIXTURE_GAME}.json").open(encoding="utf-8") as f:
+            self.box = json.load(f)
+        with (DUMPS / f"pbp_{FIXTURE_GAME}.json").open(encoding="utf-8") as f:
+            self.pbp = json.load(f)
+        self.synthetic = [f"00299{i:05d}" for i in range(games)]
+        self._bodies = {}  # (path, tick) -> (body, etag)
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    # -- synthetic game timeline --
+    def progress(self, game_id, now):
+        """<0 pregame, 0..1 in progress, >=1 final. Games start staggered so
+        a run sees every state at once."""
+        if game_id not in self.synthetic:
+            return 1.0
+        i = self.synthetic.index(game_id)
+        return (now - self.t0) / self.game_seconds + 1.5 * i / max(self.games, 1) - 0.5
+
+    def tip_time(self, game_id, now):
+        p = self.progress(game_id, now)
+        return dt.datetime.fromtimestamp(now - p * self.game_seconds, dt.timezone.utc)
+
+    def _status(self, game_id, now):
+        p = self.progress(game_id, now)
+        if p < 0:
+            return p, 1, "7:00 pm ET", 0, ""
+        if p >= 1:
+            return p, 3, "Final", 4, "PT00M00.00S"
+        period = min(4, int(p * 4) + 1)
+        left = 720 * (1 - (p * 4 - (period - 1)))
+        m, s = int(left // 60), left % 60
+        return p, 2, f"Q{period} {m}:{int(s):02d}", period, f"PT{m:02d}M{s:05.2f}S"
+
+    def boxscore(self, game_id, now):
+        if game_id == FIXTURE_GAME:
+            return self.box
+        if game_id not in self.synthetic:
+            return None
+        p, status, text, period, clock = self._status(game_id, now)
+        doc = copy.deepcopy(self.box)
+        g = doc["game"]
+        g.update(gameId=game_id, gameStatus=status, gameStatusText=text, period=period, gameClock=clock,
+                 gameTimeUTC=self.tip_time(game_id, now).strftime("%Y-%m-%dT%H:%M:%SZ"))
+        scale = min(max(p, 0.0), 1.0)
+        for team in (g["homeTeam"], g["awayTeam"]):
+            team["score"] = round(team["score"] * scale)
+            for key in SCALED_STATS:
+                if key in team.get("statistics", {}):
+                    team["statistics"][key] = round(team["statistics"][key] * scale)
+            for player in team.get("players", []):
+                stats = player.get("statistics", {})
+                for key in SCALED_STATS:
+                    if key in stats:
+                        stats[key] = round(stats[key] * scale)
+        return doc
+
+    def playbyplay(self, game_id, now):
+        if game_id == FIXTURE_GAME:
+            return self.pbp
+        if game_id not in self.synthetic:
+            return None
+        p = self.progress(game_id, now)
+        if p < 0:
+            return None  # The real CDN 403s play-by-play before tip-off
+        actions = self.pbp["game"]["actions"]
+        doc = {"meta": self.pbp["meta"], "game": {"gameId": game_id}}
+        doc["game"]["actions"] = actions[:max(1, int(len(actions) * min(p, 1.0)))]
+        return doc
+
+    def scoreboard(self, now):
+        games = []
+        for gid in self.synthetic:
+            g = self.boxscore(gid, now)["game"]
+            games.append({
+                "gameId": gid, "gameStatus": g["gameStatus"], "gameStatusText": g["gameStatusText"],
+                "period": g["period"], "gameClock": g["gameClock"], "gameTimeUTC": g["gameTimeUTC"],
+                "homeTeam": {k: g["homeTeam"][k] for k in ("teamId", "teamTricode", "teamName", "teamCity", "score")},
+                "awayTeam": {k: g["awayTeam"][k] for k in ("teamId", "teamTricode", "teamName", "teamCity", "score")},
+            })
+        today = dt.datetime.now(dt.timezone.utc).date().isoformat()
+        return {"meta": {"version": 1}, "scoreboard": {"gameDate": today, "leagueId": "00", "games": games}}
+
+    def schedule(self, now):
+        def entry(doc, game_id, status):
+            g = doc["game"]
+            team = lambda t: {k: t[k] for k in ("teamId", "teamTricode", "teamName", "teamCity")}
+            return {"gameId": game_id, "gameStatus": status, "gameStatusText": g["gameStatusText"],
+                    "gameDateTimeUTC": g["gameTimeUTC"], "arenaName": g["arena"]["arenaName"],
+                    "arenaCity": g["arena"]["arenaCity"],
+                    "homeTeam": team(g["homeTeam"]), "awayTeam": team(g["awayTeam"])}
+        today = dt.datetime.now(dt.timezone.utc).strftime("%m/%d/%Y 00:00:00")
+        return {"leagueSchedule": {"gameDates": [
+            {"gameDate": FIXTURE_DATE, "games": [entry(self.box, FIXTURE_GAME, 3)]},
+            {"gameDate": today, "games": [entry(self.boxscore(gid, self.t0), gid, 1) for gid in self.synthetic]},
+        ]}}
+
+    # -- HTTP --
+    def document(self, path):
+        """(body, etag) for a CDN path, or None for a 404/403. Built once per tick."""
+        tick = int(time.time() // self.tick)
+        key = (path, tick)
+        with self._lock:
+            if key in self._bodies:
+                return self._bodies[key]
+        now = tick * self.tick
+        name = path.rsplit("/", 1)[-1].removesuffix(".json")
+        body = None
+        if path.startswith(LOGO_PREFIX) and path.endswith("/logo.svg"):
+            team_id = path[len(LOGO_PREFIX):].split("/", 1)[0]
+            doc, body = None, placeholder_logo(team_id) if team_id.isdigit() else None
+        elif path.startswith(HEADSHOT_PREFIX) and path.endswith(".png"):
+            player_id = name.removesuffix(".png")
+            doc, body = None, placeholder_headshot(player_id) if player_id.isdigit() else None
+        elif path == LIVE_PREFIX + "scoreboard/todaysScoreboard_00.json":
+            doc = self.scoreboard(now)
+        elif path.startswith(LIVE_PREFIX + "boxscore/boxscore_"):
+            doc = self.boxscore(name.removeprefix("boxscore_"), now)
+        elif path.startswith(LIVE_PREFIX + "playbyplay/playbyplay_"):
+            doc = self.playbyplay(name.removeprefix("playbyplay_"), now)
+        elif path == f"{SCHEDULE_PREFIX}{self.schedule_version}.json":
+            doc = self.schedule(now)
+        else:
+            doc = None
+        out = None
+        if doc is not None:
+            body = json.dumps(doc, separators=(",", ":")).encode()
+        if body is not None:
+            out = (body, '"%s"' % hashlib.sha1(body).hexdigest()[:16])
+        with self._lock:
+            if len(self._bodies) > 512:
+                self._bodies.clear()
+            self._bodies[key] = out
+        return out
+
+    @staticmethod
+    def kind(path):
+        for kind in ("scoreboard", "boxscore", "playbyplay", "schedule", "logos", "headshots"):
+            if kind in path.lower():
+                return kind
+        return "other"
+
+    def count(self, path, status):
+        with self._lock:
+            self._counts[f"{self.kind(path)} {status}"] += 1
+
+    def stats(self):
+        """{"<kind> <status>": n, ...} plus a total."""
+        with self._lock:
+            out = dict(self._counts)
+        out["total"] = sum(out.values())
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+def make_handler(cdn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/_stats":
+                return self._send(200, json.dumps(cdn.stats()).encode(), {"Content-Type": "application/json"})
+            if path == "/_reset":
+                cdn.reset()
+                return self._send(204)
+
+            if cdn.latency_ms or cdn.jitter_ms:
+                time.sleep(max(0.0, cdn.latency_ms + cdn.random.uniform(-cdn.jitter_ms, cdn.jitter_ms)) / 1000)
+            roll = cdn.random.random()
+            if roll < cdn.throttle_rate:
+                status, body, headers = 429, b"", {"Retry-After": "1"}
+            elif roll < cdn.throttle_rate + cdn.error_rate:
+                status, body, headers = cdn.random.choice((500, 502, 503)), b"", {}
+            else:
+                doc = cdn.document(path)
+                if doc is None:
+                    status, body, headers = (403 if "playbyplay" in path else 404), b"", {}
+                elif self.headers.get("If-None-Match") == doc[1]:
+                    status, body, headers = 304, b"", {"ETag": doc[1]}
+                else:
+                    content_type = CONTENT_TYPES.get(path[path.rfind("."):], "application/octet-stream")
+                    status, body, headers = 200, doc[0], {"ETag": doc[1], "Content-Type": content_type}
+            cdn.count(path, status)
+            self._send(status, body, headers)
+
+    return Handler
+
+def start(cdn, host="127.0.0.1", port=0):
+    """Serve cdn on a daemon thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(cdn))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-cdn", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--games", type=int, default=12)
+    ap.add_argument("--game-seconds", type=float, default=600)
+    ap.add_argument("--tick", type=float, default=3)
+    ap.add_argument("--latency", type=float, default=0, help="mean upstream latency, ms")
+    ap.add_argument("--jitter", type=float, default=0, help="± latency jitter, ms")
+    ap.add_argument("--error-rate", type=float, default=0, help="fraction of 5xx responses")
+    ap.add_argument("--throttle-rate", type=float, default=0, help="fraction of 429 responses")
+    args = ap.parse_args()
+    cdn = FakeCDN(games=args.games, game_seconds=args.game_seconds, tick=args.tick, latency_ms=args.latency,
+                  jitter_ms=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    server, base = start(cdn, "0.0.0.0", args.port)
+    print(f"fake CDN on {base} ({args.games} synthetic games + {FIXTURE_GAME})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# prefetch.py - background refresh of games that are live or about to tip off
+#
+# Keeps the cache warm so viewers of live games hit the cache instead of
+# waiting on the CDN after each TTL expiry. What to refresh and how comes
+# from server.py through three callbacks; this module owns the cadence and
+# the upstream request budget.
+import time
+import threading
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, n=1):
+        """Spend n tokens if available; False (and spend nothing) otherwise."""
+        return self.reserve(n) == 0
+
+    def reserve(self, n=1, max_wait=0.0):
+        """Spend n tokens, borrowing against the refill if need be. Returns
+        the seconds to wait before using them (0 = now), or None (and spends
+        nothing) if that would be longer than max_wait. Borrowed tokens put
+        later callers in line behind this one."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            delay = max(0.0, (n - self.tokens) / self.rate)
+            if delay > max_wait:
+                return None
+            self.tokens -= n
+            return delay
+
+class PrefetchScheduler:
+    """
+    discover() -> [game_id, ...]   games worth keeping warm, most urgent first
+    cost(game_id) -> int           upstream requests a refresh would make now (0 = still fresh)
+    refresh([game_id, ...]) -> set game ids that turned out to be final
+
+    Every `interval` seconds the due games are refreshed, in discovery order,
+    until the per-minute request budget runs out; the rest wait a tick.
+    The game list is rediscovered every `discover_every` seconds.
+    """
+    def __init__(self, discover, cost, refresh, interval=5.0, discover_every=60.0, budget_per_min=240):
+        self.discover = discover
+        self.cost = cost
+        self.refresh = refresh
+        self.interval = interval
+        self.discover_every = discover_every
+        self.bucket = TokenBucket(budget_per_min / 60.0, max(budget_per_min / 4.0, 2))
+        self.active = []
+        self._next_discover = 0.0
+        self._counts = {"ticks": 0, "refreshed": 0, "over_budget": 0, "finished": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def tick(self):
+        """One scheduling round (the loop body; callable directly in tests/tools)."""
+        now = time.monotonic()
+        if now >= self._next_discover:
+            try:
+                self.active = list(self.discover())
+                self._next_discover = now + self.discover_every
+            except Exception:
+                self._count("errors")  # Keep the old list; retry next tick
+                self._next_discover = now + self.interval
+
+        due = []
+        for game_id in self.active:
+            cost = self.cost(game_id)
+            if not cost:
+                continue
+            if not self.bucket.take(cost):
+                self._count("over_budget", len(self.active) - self.active.index(game_id))
+                break
+            due.append(game_id)
+
+        self._count("ticks")
+        if not due:
+            return
+        try:
+            finished = self.refresh(due)
+        except Exception:
+            self._count("errors")
+            return
+        self._count("refreshed", len(due))
+        if finished:
+            self._count("finished", len(finished))
+            self.active = [g for g in self.active if g not in finished]
+
+    def _run(self):
+        while True:
+            self.tick()
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counts)
+        out["running"] = self._thread is not None
+        out["active"] = len(self.active)
+        return out
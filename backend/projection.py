@@ -0,0 +1,63 @@
+# projection.py - sparse fieldsets (?fields=) for the raw CDN documents
+#
+# A field spec is a comma-separated list of dotted paths. A bare name reuses
+# the parent of the path before it, so "game.actions.clock,description,scoreHome"
+# means game.actions.clock, .description and .scoreHome. Lists are
+# projected element by element, so "game.homeTeam.players.statistics.points"
+# keeps the points of every player.
+from functools import lru_cache
+
+MAX_FIELD_PATHS = 64
+MAX_FIELDS_LENGTH = 1024
+
+class FieldSpecError(ValueError):
+    pass
+
+@lru_cache(maxsize=256)
+def compile_fields(spec):
+    """
+    Parse a field spec into (canonical, tree). tree maps a key to its
+    sub-tree, or to None to keep the whole value. canonical is a sorted,
+    normalized spelling, so equivalent specs share one cached output.
+    """
+    if len(spec) > MAX_FIELDS_LENGTH:
+        raise FieldSpecError("fields is too long")
+    paths, parent = [], ()
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = tuple(item.split("."))
+        if not all(parts):
+            raise FieldSpecError(f"bad field path: {item!r}")
+        if len(parts) > 1:
+            parent = parts[:-1]
+        else:
+            parts = parent + parts
+        paths.append(parts)
+    if not paths:
+        raise FieldSpecError("fields is empty")
+    if len(paths) > MAX_FIELD_PATHS:
+        raise FieldSpecError(f"at most {MAX_FIELD_PATHS} field paths")
+
+    tree = {}
+    for parts in sorted(set(paths)):
+        node = tree
+        for i, part in enumerate(parts):
+            if part in node and node[part] is None:
+                break  # An ancestor is already kept whole
+            if i == len(parts) - 1:
+                node[part] = None
+            else:
+                node = node.setdefault(part, {})
+    return ",".join(".".join(p) for p in sorted(set(paths))), tree
+
+def project(value, tree):
+    """Copy of value with only the fields in tree (from compile_fields)."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(v, tree) for v in value]
+    if isinstance(value, dict):
+        return {k: project(v, tree[k]) for k, v in value.items() if k in tree}  # Document order
+    return value  # Path goes deeper than the data; keep the scalar
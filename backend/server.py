@@ -1,24 +1,96 @@
 # server.py - Optimized NBA API Backend
 import os
-from flask import Flask, request, jsonify, make_response, redirect
+from flask import Flask, Response, request, jsonify, make_response, redirect, stream_with_context, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_compress import Compress
 import time
-import json
+import datetime as dt
 import hashlib
+import hmac
+import gzip
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeout
+from collections import OrderedDict
 import threading
+import atexit
+
+import codec
+import cache_policy
+from cache_backends import make_cache
+from archive import make_archive
+from streams import StreamHub
+from upstream_async import AsyncUpstream
+import snapshot
+import metrics
+import timing
+from projection import FieldSpecError, compile_fields, project
+from action_index import ActionIndexRegistry
+from prefetch import PrefetchScheduler
+from breaker import UpstreamGuard, UpstreamUnavailable, retry_after_seconds
+from assets import make_asset_store, make_asset, build_logo_sprite, data_uri
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through codec (orjson when installed). Keys keep their
+    insertion order; sorting them only cost time."""
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get("indent"):  # Debug pretty-printing
+            return super().dumps(obj, **kwargs)
+        with timing.phase("encode"):
+            return codec.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
 
 app = Flask(__name__)
-CORS(app, origins="*", supports_credentials=True)
+app.json = FastJSONProvider(app)
+
+# ---------------- Server-Timing + opt-in profiling ----------------
+# Registered before CORS/Compress: before_request hooks run in registration
+# order and after_request hooks in reverse, so these bracket everything,
+# flask-compress included. Profiling is off unless PROFILE_SAMPLE_RATE > 0
+# or a request carries X-Profile: <ADMIN_TOKEN>; results are at /admin/profiles
+# (with X-Admin-Token, so only when ADMIN_TOKEN is set).
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PROFILER = timing.Profiler(sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0)))
+
+@app.before_request
+def _start_request():
+    g.request_start = time.perf_counter()
+    forced = bool(ADMIN_TOKEN) and request.headers.get("X-Profile") == ADMIN_TOKEN
+    g.profile = PROFILER.start(forced)
+
+@app.after_request
+def _server_timing(resp):
+    start = g.get("request_start")
+    if start is None:
+        return resp
+    end = time.perf_counter()
+    precompress = g.get("precompress")
+    if precompress is not None and "Content-Encoding" in resp.headers and not g.get("precompressed"):
+        timing.add("compress", end - precompress)  # flask-compress (and CORS, which is negligible)
+    resp.headers["Server-Timing"] = timing.header(end - start)
+    resp.headers["Timing-Allow-Origin"] = "*"
+    return resp
+
+@app.teardown_request
+def _finish_profile(_exc):
+    # Teardown runs even when the view raised, so the profiler is always released
+    prof = g.pop("profile", None)
+    if prof is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        PROFILER.finish(prof, route, request.full_path.rstrip("?"), time.perf_counter() - g.request_start)
+
+# The frontend is always cross-origin; it reads ETag to send If-None-Match on /poll
+CORS(app, origins="*", supports_credentials=True, expose_headers=["ETag"])
 
 # Enable gzip/brotli compression for all responses
 Compress(app)
-app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/css', 'text/javascript']
+app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/css', 'text/javascript', 'image/svg+xml']
 app.config['COMPRESS_MIN_SIZE'] = 500  # Only compress responses > 500 bytes
 
 # Thread pool for concurrent requests
@@ -38,10 +110,12 @@ UA = {
 def make_session():
     s = requests.Session()
     s.headers.update(UA)
+    # One quick retry for a transient error. 429 isn't retried at all;
+    # sustained trouble is the circuit breaker's job (see GUARD).
     retry = Retry(
-        total=3,  # Reduced from 5 for faster failures
+        total=1,
         backoff_factor=0.3,
-        status_forcelist=(429, 500, 502, 503, 504),
+        status_forcelist=(500, 502, 503, 504),
         allowed_methods=frozenset(["GET", "HEAD"]),
         raise_on_status=False,
     )
@@ -56,243 +130,1243 @@ def make_session():
 
 S = make_session()
 
+# Circuit breaker per key family + token bucket on all CDN requests (see breaker.py)
+GUARD = UpstreamGuard(
+    rate=float(os.environ.get("UPSTREAM_RATE", 20)),  # Requests per second
+    burst=int(os.environ.get("UPSTREAM_BURST", 40)),
+    failures=int(os.environ.get("BREAKER_FAILURES", 5)),
+    cooldown=float(os.environ.get("BREAKER_COOLDOWN", 15)),
+    budgets={"asset": (10.0, 80)},  # Logos/headshots: bursty when cold, then cached for days
+)
+# How long a request may queue for a budget token before it is refused;
+# a cold 120-game batch needs (120 - burst) / rate = 4s at the defaults
+UPSTREAM_MAX_WAIT = float(os.environ.get("UPSTREAM_MAX_WAIT", 5))
+
 # ---------------- NBA CDN endpoints ----------------
-CDN_SCOREBOARD_TODAY = "https://cdn.nba.com/static/json/liveData/scoreboard/todaysScoreboard_00.json"
-CDN_BOXSCORE = "https://cdn.nba.com/static/json/liveData/boxscore/boxscore_{gid}.json"
-CDN_PBP = "https://cdn.nba.com/static/json/liveData/playbyplay/playbyplay_{gid}.json"
-SCHEDULE_FMT = "https://cdn.nba.com/static/json/staticData/scheduleLeagueV2_{v}.json"
+# NBA_CDN_BASE points the data feeds elsewhere, e.g. at fake_cdn.py for offline runs
+CDN_BASE = os.environ.get("NBA_CDN_BASE", "https://cdn.nba.com").rstrip("/")
+CDN_SCOREBOARD_TODAY = CDN_BASE + "/static/json/liveData/scoreboard/todaysScoreboard_00.json"
+CDN_BOXSCORE = CDN_BASE + "/static/json/liveData/boxscore/boxscore_{gid}.json"
+CDN_PBP = CDN_BASE + "/static/json/liveData/playbyplay/playbyplay_{gid}.json"
+SCHEDULE_FMT = CDN_BASE + "/static/json/staticData/scheduleLeagueV2_{v}.json"
 SCHEDULE_VERSIONS = [12, 11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
 
-TEAM_LOGO = "https://cdn.nba.com/logos/nba/{teamId}/global/L/logo.svg"
-PLAYER_HEADSHOT = "https://cdn.nba.com/headshots/nba/latest/260x190/{playerId}.png"
+TEAM_LOGO = CDN_BASE + "/logos/nba/{teamId}/global/L/logo.svg"
+PLAYER_HEADSHOT = CDN_BASE + "/headshots/nba/latest/260x190/{playerId}.png"
+TEAM_IDS = range(1610612737, 1610612767)  # The 30 franchises
 
-# ---------------- Thread-safe in-memory cache ----------------
-class ThreadSafeCache:
-    def __init__(self):
-        self._cache = {}
-        self._lock = threading.RLock()
-    
-    def get(self, key, ttl):
+# ---------------- Cache backend ----------------
+# CACHE_BACKEND=memory (default, per process) or sqlite (shared by all
+# gunicorn workers on the host); see cache_backends.py
+CACHE = make_cache()
+ARCHIVE = make_archive()  # Final games on disk; None when ARCHIVE_MAX_BYTES=0
+
+def cache_get(key, ttl):
+    return CACHE.get(key, ttl)
+
+def cache_set(key, data, is_final=False, validators=None, live=False, local=False):
+    CACHE.set(key, data, is_final, validators, live, local)
+
+def load_once(key, ttl, loader):
+    """Run loader() unless another worker process is already loading key,
+    in which case wait for its result. Returns (data, from_cache)."""
+    with CACHE.lease(key) as owner:
+        if not owner:
+            data = CACHE.wait_for(key, ttl)
+            if data is not None:
+                return data, True
+        return loader(), False
+
+# ---------------- Single-flight + cache stats ----------------
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+    Followers wait at most `wait` seconds for the leader."""
+    def __init__(self, wait=30.0):
+        self.wait = wait
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """Returns (future, leader). The leader must resolve() the key;
+        everyone else waits on the future."""
         with self._lock:
-            entry = self._cache.get(key)
-            if entry and (time.time() - entry["ts"] < ttl):
-                return entry["data"]
-            return None
-    
-    def set(self, key, data, is_final=False):
+            fut = self._calls.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._calls[key] = Future()
+            return fut, True
+
+    def resolve(self, key, fut, result=None, error=None):
         with self._lock:
-            # Final games get longer cache (1 hour)
-            self._cache[key] = {
-                "data": data, 
-                "ts": time.time(),
-                "final": is_final
-            }
-    
-    def get_ttl(self, key):
-        """Get remaining TTL for a key"""
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def abandon(self, key, fut):
+        """Forget a flight whose leader never resolved it, so the next caller leads."""
         with self._lock:
-            entry = self._cache.get(key)
-            if entry:
-                return entry.get("final", False)
-            return False
-    
-    def cleanup(self, max_age=3600):
-        """Remove entries older than max_age seconds"""
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+
+    def do(self, key, fn):
+        """Run fn() once per key; concurrent callers wait for that result.
+        Returns (result, shared) where shared=True means another thread ran fn."""
+        fut, leader = self.claim(key)
+        if not leader:
+            with timing.phase("wait"):
+                try:
+                    return fut.result(self.wait), True
+                except FutureTimeout:
+                    self.abandon(key, fut)
+                    raise
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, fut, error=e)
+            raise
+        self.resolve(key, fut, result)
+        return result, False
+
+    def in_flight(self):
         with self._lock:
-            now = time.time()
-            keys_to_delete = [
-                k for k, v in self._cache.items() 
-                if now - v["ts"] > max_age
-            ]
-            for k in keys_to_delete:
-                del self._cache[k]
+            return len(self._calls)
 
-CACHE = ThreadSafeCache()
+    def busy(self, key):
+        with self._lock:
+            return key in self._calls
 
-def cache_get(key, ttl):
-    return CACHE.get(key, ttl)
+def key_family(key):
+    """"box:0022400554" -> "box" (the label used for per-family metrics)."""
+    return key.split(":", 1)[0] if key else "other"
 
-def cache_set(key, data, is_final=False):
-    CACHE.set(key, data, is_final)
+class CacheStats:
+    """Thread-safe hit/miss/coalesced counters, overall and per key family."""
+    def __init__(self):
+        self._counts = {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0, "served_stale": 0,
+                        "not_modified": 0, "errors": 0, "refreshes": 0, "refresh_errors": 0}
+        self._families = {}  # (family, name) -> count
+        self._lock = threading.Lock()
 
-def fetch_json_throttled(key, url, ttl, check_final=False):
-    """Fetch JSON with caching. Final games use longer TTL."""
-    # Check if this is a final game (use longer TTL)
-    if check_final and CACHE.get_ttl(key):
-        ttl = 3600  # 1 hour for final games
-    
+    def incr(self, name, key=None, n=1):
+        fam = (key_family(key), name)
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+            self._families[fam] = self._families.get(fam, 0) + n
+
+    def families(self):
+        with self._lock:
+            return dict(self._families)
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self._counts)
+        served = out["hits"] + out["coalesced"] + out["stale"]
+        lookups = served + out["misses"]
+        # Coalesced and stale callers were served without their own upstream call
+        out["hit_ratio"] = round(served / lookups, 4) if lookups else None
+        return out
+
+INFLIGHT = SingleFlight(wait=float(os.environ.get("INFLIGHT_WAIT", 30)))
+STATS = CacheStats()
+
+# ---------------- Metrics (served at /metrics) ----------------
+HTTP_LATENCY = metrics.Histogram("nba_http_request_duration_seconds", "Route latency", ("route", "method"))
+HTTP_RESPONSES = metrics.Counter("nba_http_responses_total", "Responses by route and status", ("route", "status"))
+UPSTREAM_LATENCY = metrics.Histogram("nba_upstream_request_duration_seconds", "CDN request latency", ("family",))
+UPSTREAM_RESPONSES = metrics.Counter("nba_upstream_responses_total", "CDN responses by status", ("family", "status"))
+UPSTREAM_RETRIES = metrics.Counter("nba_upstream_retries_total", "CDN request retries", ("family",))
+
+def observe_upstream(key, status, seconds, retries=0):
+    family = key_family(key)
+    UPSTREAM_LATENCY.observe(seconds, family)
+    UPSTREAM_RESPONSES.inc(family, str(status))
+    if retries:
+        UPSTREAM_RETRIES.inc(family, n=retries)
+
+@app.after_request
+def _record_request(resp):
+    start = g.get("request_start")  # Set by _start_request
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - start, route, request.method)
+        HTTP_RESPONSES.inc(route, str(resp.status_code))
+    g.precompress = time.perf_counter()  # flask-compress runs next
+    return resp
+
+@app.after_request
+def _mark_stale(resp):
+    """Responses built from a last-good copy because the CDN failed carry
+    X-Data-Stale and must be revalidated instead of cached."""
+    if g.get("served_stale") and resp.status_code < 400:
+        resp.headers["X-Data-Stale"] = "1"
+        resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def _store_response(key, check_final, status, headers, body):
+    """Apply an upstream response to the cache and return the data.
+    A 304 just refreshes the entry; returns None if the entry is gone."""
+    if status == 304:
+        data = CACHE.touch(key)
+        if data is not None:
+            STATS.incr("not_modified", key)
+        return data
+    with timing.phase("parse"):
+        data = codec.loads(body)
+    validators = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+    # Final games are kept as immutable (and archived); games in progress
+    # go in the cache's priority segment. Documents without a game header
+    # (pbp) take the state of the game's boxscore.
+    is_final = is_live = False
+    if check_final:
+        facts = cache_policy.game_facts(data)
+        if facts["status"] is None:
+            state = game_policy(key.split(":", 1)[1]).state
+        else:
+            state = cache_policy.game_state(facts)
+        is_final = state == "final"
+        is_live = state in ("live", "break", "halftime")
+
+    cache_set(key, data, is_final, validators, live=is_live)
+    if is_final and ARCHIVE is not None:
+        executor.submit(ARCHIVE.put, key, data)
+    return data
+
+def upstream_get(key, url, headers=None, timeout=10):
+    """S.get, recording status, latency and urllib3 retries under key's family.
+    Waits for a request budget token (at most UPSTREAM_MAX_WAIT, and well
+    inside timeout); raises UpstreamUnavailable without a request while the
+    family's breaker is open or no token comes in time."""
+    family = key_family(key)
+    queued = GUARD.acquire(family, wait=min(UPSTREAM_MAX_WAIT, timeout / 2))
+    if queued:
+        timing.add("queue", queued)
+    start = time.perf_counter()
+    try:
+        r = S.get(url, timeout=timeout, headers=headers)
+        _ = r.content  # Read the body here so the cdn phase includes the download
+    except Exception:
+        GUARD.record(family, None)
+        observe_upstream(key, "error", time.perf_counter() - start)
+        raise
+    finally:
+        timing.add("cdn", time.perf_counter() - start)
+    GUARD.record(family, r.status_code, retry_after_seconds(r.headers.get("Retry-After")))
+    retries = getattr(getattr(r, "raw", None), "retries", None)
+    observe_upstream(key, r.status_code, time.perf_counter() - start,
+                     len(retries.history) if retries is not None else 0)
+    return r
+
+def _load_upstream(key, url, check_final):
+    """Fetch url, store it under key and return the parsed JSON.
+    Revalidates with the upstream ETag/Last-Modified when we have them,
+    so an unchanged document costs a 304 instead of a download + parse."""
+    headers = _conditional_headers(CACHE.validators(key))
+    r = upstream_get(key, url, headers)
+    if r.status_code == 304:
+        data = _store_response(key, check_final, 304, r.headers, None)
+        if data is not None:
+            return data
+        # Entry vanished between the request and the 304; fetch it in full
+        r = upstream_get(key, url)
+    r.raise_for_status()
+    return _store_response(key, check_final, r.status_code, r.headers, r.content)
+
+def _fill(key, url, ttl, check_final):
+    """Return (data, from_cache): the cached copy if a previous flight (in this
+    or another worker) already refreshed key, otherwise an upstream fetch."""
     cached = cache_get(key, ttl)
     if cached is not None:
         return cached, True
-    
-    r = S.get(url, timeout=10)  # Reduced timeout from 12
-    r.raise_for_status()
-    data = r.json()
-    
-    # Check if game is final for cache optimization
-    is_final = False
+    return load_once(key, ttl, lambda: _load_upstream(key, url, check_final))
+
+def _refresh_in_background(key, url, ttl, check_final):
+    """Revalidate a stale entry on the executor; one refresh per key at a time."""
+    if INFLIGHT.busy(key):
+        return
+
+    def refresh():
+        try:
+            INFLIGHT.do(key, lambda: _fill(key, url, ttl, check_final))
+            STATS.incr("refreshes", key)
+        except Exception:
+            # Keep serving the stale copy; the next request past hard TTL retries inline
+            STATS.incr("refresh_errors", key)
+
+    executor.submit(refresh)
+
+def game_policy(game_id):
+    """Cache policy for a game from its cached boxscore's state (the
+    default live policy when the boxscore isn't cached)."""
+    facts = cache_derived(f"box:{game_id}", "facts", cache_policy.game_facts)
+    return cache_policy.policy_for(facts)
+
+def _cached_or_refresh(key, url, ttl, check_final, stale_ttl, ahead=0):
+    """Cached data for key if usable (fresh, or stale with a background
+    refresh queued), else None. Also returns the effective TTL.
+    Game documents ("box:<id>", "pbp:<id>") take ttl/stale_ttl from the
+    game's cache policy once its state is known; ahead shortens the ttl
+    for callers refreshing early."""
     if check_final:
-        game = data.get("game", {})
-        status = game.get("gameStatusText", "")
-        is_final = status.lower() == "final"
-    
-    cache_set(key, data, is_final)
-    return data, False
+        facts = cache_derived(f"box:{key.split(':', 1)[1]}", "facts", cache_policy.game_facts)
+        if facts is not None:
+            policy = cache_policy.policy_for(facts)
+            if policy.state == "final" and not CACHE.is_final(key):
+                policy = cache_policy.DEFAULT  # Fetched before the final buzzer; refresh once more
+            ttl, stale_ttl = policy.ttl, policy.stale_ttl
+    ttl = max(ttl - ahead, 1)
+
+    cached, state = CACHE.lookup(key, ttl, ttl + stale_ttl)
+    if state == "fresh":
+        STATS.incr("hits", key)
+        return cached, ttl
+    if state == "stale":
+        STATS.incr("stale", key)
+        _refresh_in_background(key, url, ttl, check_final)
+        return cached, ttl
+    if check_final and ARCHIVE is not None:
+        archived = ARCHIVE.get(key)
+        if archived is not None:
+            STATS.incr("hits", key)
+            cache_set(key, archived, is_final=True)
+            return archived, ttl
+    return None, ttl
+
+def serve_stale(key):
+    """Last cached copy of key whatever its age, or None; for when the
+    upstream fetch failed. Marks the current response stale (X-Data-Stale)."""
+    data, _ = CACHE.lookup(key, 0, float("inf"))
+    if data is not None:
+        STATS.incr("served_stale", key)
+        if has_request_context():
+            g.served_stale = True
+    return data
+
+def fetch_json_throttled(key, url, ttl, check_final=False, stale_ttl=20):
+    """Fetch JSON with caching. Final games use longer TTL.
+    Entries older than ttl but younger than ttl + stale_ttl are served
+    immediately while a background refresh runs (stale-while-revalidate).
+    Concurrent misses for the same key share a single upstream request.
+    If the upstream fails (or its breaker is open) the last good copy is
+    served, however old."""
+    cached, ttl = _cached_or_refresh(key, url, ttl, check_final, stale_ttl)
+    if cached is not None:
+        return cached, True
+
+    try:
+        (data, from_cache), shared = INFLIGHT.do(key, lambda: _fill(key, url, ttl, check_final))
+    except Exception:
+        STATS.incr("errors", key)
+        stale = serve_stale(key)
+        if stale is not None:
+            return stale, True
+        raise
+    if shared:
+        STATS.incr("coalesced", key)
+        return data, True
+    STATS.incr("hits" if from_cache else "misses", key)
+    return data, from_cache
 
 def stable_hash(obj) -> str:
-    return hashlib.sha256(
-        json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
-    ).hexdigest()[:16]  # Shorter hash is fine for ETags
+    with timing.phase("hash"):
+        return hashlib.sha256(
+            codec.dumps_sorted(obj)
+        ).hexdigest()[:16]  # Shorter hash is fine for ETags
+
+# ---------------- Derived views (built once per upstream version) ----------------
+def cache_derived(key, name, build):
+    """build(data) for key's cached data, memoized until the data changes."""
+    return CACHE.derived(key, name, build)
+
+def json_view(data):
+    """Serialized body + ETag for serving a cached document as-is."""
+    with timing.phase("encode"):
+        body = codec.dumps(data)
+    with timing.phase("hash"):
+        etag = hashlib.sha256(body).hexdigest()[:16]
+    return {"body": body, "etag": etag}
+
+def cached_view(key, name, data, build):
+    """Derived view of the cached entry, or built directly if key was evicted."""
+    def build_view(data):
+        view = build(data)
+        view["source"] = (key, name)  # Where pre-compressed variants are memoized
+        return view
+    view = cache_derived(key, name, build_view)
+    return view if view is not None else build_view(data)
+
+def document_view(key, data):
+    """Cached view of a raw document, projected to ?fields= when given.
+    Raises FieldSpecError for a malformed spec."""
+    spec = request.args.get("fields")
+    if not spec:
+        return cached_view(key, "json", data, json_view)
+    canonical, tree = compile_fields(spec)
+
+    def build(d):
+        with timing.phase("project"):
+            projected = project(d, tree)
+        return json_view(projected)
+    return cached_view(key, f"json:fields={canonical}", data, build)
+
+# ---------------- Pre-compressed bodies ----------------
+# Cached bodies are compressed once per upstream version (harder than
+# flask-compress does per request, since the cost is paid once) and then
+# served as-is; a Content-Encoding header makes flask-compress skip them.
+try:
+    import brotli
+except ImportError:  # flask-compress may be using brotlicffi, or none at all
+    brotli = None
+
+PRECOMPRESS_MIN_SIZE = 500  # Same threshold as COMPRESS_MIN_SIZE
+ENCODERS = {"gzip": lambda body: gzip.compress(body, 9)}
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=9)
+
+def _qvalue(params):
+    """q from an Accept-Encoding entry's parameters ("q=0.5"); 1 when absent,
+    0 when malformed."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+def choose_encoding():
+    """Best encoding we can pre-compress to that the client accepts (br > gzip)."""
+    accepted = {}
+    for part in (request.headers.get("Accept-Encoding") or "").split(","):
+        name, *params = part.split(";")
+        accepted[name.strip().lower()] = _qvalue(params)
+    for enc in ("br", "gzip"):
+        if enc in ENCODERS and accepted.get(enc, 0) > 0:
+            return enc
+    return None
+
+def encoded_body(view, enc):
+    """view["body"] compressed with enc, memoized next to the view."""
+    def build(_data):
+        with timing.phase("compress"):
+            return {"body": ENCODERS[enc](view["body"])}
+    key, name = view.get("source", (None, None))
+    encoded = cache_derived(key, f"{name}:{enc}", build) if key else None
+    return (encoded or build(None))["body"]
+
+# flask-compress turns a strong ETag "x" into "x:gzip"/"x:br", so strip that too
+_ENCODING_SUFFIXES = (":gzip", ":br", ":deflate", ":zstd")
+
+def client_etags():
+    """Normalized ETags from If-None-Match (quotes, W/ and encoding suffix removed)."""
+    out = set()
+    for tag in (request.headers.get("If-None-Match") or "").split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in _ENCODING_SUFFIXES:
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)]
+                break
+        if tag:
+            out.add(tag)
+    return out
+
+def view_response(view, cache_control):
+    """200 with the pre-serialized (and, if accepted, pre-compressed) body,
+    or 304 when the client already has it."""
+    if view["etag"] in client_etags():
+        resp = make_response("", 304)
+        resp.headers["ETag"] = view["etag"]
+    elif len(view["body"]) >= PRECOMPRESS_MIN_SIZE and (enc := choose_encoding()):
+        resp = make_response(encoded_body(view, enc))
+        resp.mimetype = "application/json"
+        resp.headers["Content-Encoding"] = enc
+        resp.headers["Vary"] = "Accept-Encoding"
+        g.precompressed = True  # Server-Timing: flask-compress leaves this alone
+        # Same tag shape flask-compress produces, so clients see no difference
+        resp.set_etag(f"{view['etag']}:{enc}")
+    else:
+        resp = make_response(view["body"])
+        resp.mimetype = "application/json"
+        resp.headers["ETag"] = view["etag"]
+    resp.headers["Cache-Control"] = cache_control
+    return resp
 
 # ---------------- schedule helpers ----------------
-@lru_cache(maxsize=1)
-def load_schedule_json_cached():
-    """Try scheduleLeagueV2_N.json until we find one with gameDates."""
-    for v in SCHEDULE_VERSIONS:
+SCHEDULE_HINT = {"version": None}  # Last scheduleLeagueV2_N that worked (kept in snapshots)
+
+def load_schedule_json():
+    """Try scheduleLeagueV2_N.json until we find one with gameDates,
+    starting with the version that worked last time."""
+    last = SCHEDULE_HINT["version"]
+    versions = ([last] if last in SCHEDULE_VERSIONS else []) + [v for v in SCHEDULE_VERSIONS if v != last]
+    for v in versions:
         url = SCHEDULE_FMT.format(v=v)
-        r = S.get(url, timeout=15)
+        r = upstream_get("schedule:json", url, timeout=15)
         if r.ok:
-            js = r.json()
+            js = codec.loads(r.content)
             if js.get("leagueSchedule", {}).get("gameDates"):
+                SCHEDULE_HINT["version"] = v
                 return js
     raise RuntimeError("Cannot load scheduleLeagueV2_* from CDN")
 
+def _schedule_team(t):
+    t = t or {}
+    return {
+        "teamId": t.get("teamId"),
+        "teamTricode": t.get("teamTricode"),
+        "teamName": t.get("teamName"),
+        "teamCity": t.get("teamCity"),
+    }
+
+def build_schedule_index(schedule_json):
+    """
+    Parse the season schedule once into lookup tables:
+      by_date: date -> [gameId, ...] in schedule order
+      by_team: teamId -> [gameId, ...] in schedule order
+      games:   gameId -> scheduled metadata
+    """
+    by_date, by_team, games = {}, {}, {}
+    for gd in schedule_json.get("leagueSchedule", {}).get("gameDates", []):
+        mmddyyyy = (gd.get("gameDate") or "").split(" ")[0]
+        try:
+            day = dt.datetime.strptime(mmddyyyy, "%m/%d/%Y").date()
+        except ValueError:
+            continue
+        for g in gd.get("games", []):
+            gid = g.get("gameId")
+            if not gid or gid in games:
+                continue
+            home, away = _schedule_team(g.get("homeTeam")), _schedule_team(g.get("awayTeam"))
+            games[gid] = {
+                "gameId": gid,
+                "date": day.isoformat(),
+                "gameDateTimeUTC": g.get("gameDateTimeUTC"),
+                "gameStatus": g.get("gameStatus"),
+                "gameStatusText": g.get("gameStatusText"),
+                "arenaName": g.get("arenaName"),
+                "arenaCity": g.get("arenaCity"),
+                "homeTeam": home,
+                "awayTeam": away,
+            }
+            by_date.setdefault(day, []).append(gid)
+            for team in (home, away):
+                if team["teamId"]:
+                    by_team.setdefault(team["teamId"], []).append(gid)
+    return {"by_date": by_date, "by_team": by_team, "games": games}
+
 def get_schedule_cached():
     """Load schedule, cache it for 12 hours."""
     js = cache_get("schedule:json", ttl=12 * 3600)
     if js is not None:
+        STATS.incr("hits", "schedule:json")
         return js
-    js = load_schedule_json_cached()
-    cache_set("schedule:json", js)
-    return js
 
-def schedule_game_ids_for_date(schedule_json, date_iso, fuzzy_days=1):
-    """Return list of gameIds for YYYY-MM-DD."""
-    import datetime as dt
-    base = dt.datetime.strptime(date_iso, "%Y-%m-%d").date()
+    def load():
+        js = load_schedule_json()
+        cache_set("schedule:json", js)
+        return js
 
-    def parse_sched_date(raw):
-        mmddyyyy = (raw or "").split(" ")[0]
-        try:
-            return dt.datetime.strptime(mmddyyyy, "%m/%d/%Y").date()
-        except Exception:
-            return None
+    # One thread per process, and with a shared cache one worker, probes the schedule URLs
+    try:
+        (js, from_cache), shared = INFLIGHT.do("schedule:json", lambda: load_once("schedule:json", 12 * 3600, load))
+    except Exception:
+        STATS.incr("errors", "schedule:json")
+        js = serve_stale("schedule:json")
+        if js is None:
+            raise
+        return js
+    STATS.incr("coalesced" if shared else "hits" if from_cache else "misses", "schedule:json")
+    return js
 
-    want = {(base + dt.timedelta(days=d)) for d in range(-fuzzy_days, fuzzy_days + 1)}
-    out = []
-    for gd in schedule_json.get("leagueSchedule", {}).get("gameDates", []):
-        d = parse_sched_date(gd.get("gameDate"))
-        if d in want:
-            for g in gd.get("games", []):
-                gid = g.get("gameId")
-                if gid:
-                    out.append(gid)
+def get_schedule_index():
+    """Schedule lookup tables, rebuilt only when the schedule itself reloads."""
+    index = cache_get("schedule:index", ttl=12 * 3600)
+    if index is not None:
+        return index
+    index = build_schedule_index(get_schedule_cached())
+    # Date-keyed tables don't serialize; each worker builds its own from the shared schedule
+    cache_set("schedule:index", index, local=True)
+    return index
 
+def schedule_game_ids_for_date(index, date_iso, fuzzy_days=1):
+    """Return list of gameIds for YYYY-MM-DD (± fuzzy_days)."""
+    base = dt.datetime.strptime(date_iso, "%Y-%m-%d").date()
     seen, uniq = set(), []
-    for gid in out:
-        if gid not in seen:
-            seen.add(gid)
-            uniq.append(gid)
+    for d in range(-fuzzy_days, fuzzy_days + 1):
+        for gid in index["by_date"].get(base + dt.timedelta(days=d), ()):
+            if gid not in seen:
+                seen.add(gid)
+                uniq.append(gid)
     return uniq
 
 # ---------------- Concurrent fetching ----------------
-def fetch_boxscore_for_game(game_id):
-    """Fetch single boxscore - used for concurrent requests"""
-    try:
-        url = CDN_BOXSCORE.format(gid=game_id)
-        data, from_cache = fetch_json_throttled(f"box:{game_id}", url, ttl=10, check_final=True)
-        return {"gameId": game_id, "data": data, "error": None}
-    except Exception as e:
-        return {"gameId": game_id, "data": None, "error": str(e)}
+# One asyncio loop + pooled aiohttp session for batches (see upstream_async.py);
+# without aiohttp, batches fall back to the thread pool.
+try:
+    ASYNC_UPSTREAM = AsyncUpstream(UA, per_host=int(os.environ.get("UPSTREAM_PER_HOST", 16)), retries=1)
+except RuntimeError:
+    ASYNC_UPSTREAM = None
 
-def fetch_multiple_boxscores(game_ids):
-    """Fetch multiple boxscores concurrently"""
-    results = []
-    futures = {executor.submit(fetch_boxscore_for_game, gid): gid for gid in game_ids}
-    
-    for future in as_completed(futures, timeout=15):
+def fetch_json_many(items, timeout=10, stale_ttl=20, ahead=0):
+    """
+    Batch fetch_json_throttled: items are (key, url, ttl, check_final).
+    Cache hits are served directly, keys already in flight are joined, and
+    the remaining misses go upstream concurrently, each with its own
+    timeout. Returns {key: (data, error)}; a slow game only fails itself.
+    """
+    out, waiting, leaders = {}, {}, []
+    for key, url, ttl, check_final in items:
+        cached, ttl = _cached_or_refresh(key, url, ttl, check_final, stale_ttl, ahead)
+        if cached is not None:
+            out[key] = (cached, None)
+            continue
+        fut, leader = INFLIGHT.claim(key)
+        waiting[key] = fut
+        if leader:
+            leaders.append((key, url, check_final, fut))
+        else:
+            STATS.incr("coalesced", key)
+
+    if leaders and ASYNC_UPSTREAM is not None:
+        # Reserve a budget token per request up front; requests past the
+        # burst start later, on their own schedule, instead of failing
+        allowed, delays = [], []
+        for leader in leaders:
+            key, fut = leader[0], leader[3]
+            try:
+                delays.append(GUARD.reserve(key_family(key), wait=min(UPSTREAM_MAX_WAIT, timeout / 2)))
+                allowed.append(leader)
+            except UpstreamUnavailable as e:
+                STATS.incr("errors", key)
+                INFLIGHT.resolve(key, fut, error=e)
+        leaders = allowed
         try:
-            result = future.result()
-            results.append(result)
+            with timing.phase("cdn"):
+                results = ASYNC_UPSTREAM.fetch_many(
+                    [(url, _conditional_headers(CACHE.validators(key)), delay)
+                     for (key, url, _, _), delay in zip(leaders, delays)],
+                    timeout=timeout,
+                )
         except Exception as e:
-            gid = futures[future]
-            results.append({"gameId": gid, "data": None, "error": str(e)})
-    
+            # No request went out, so there is no outcome to record: free any
+            # half-open probe the reservations took and fail every claimed key
+            results = []
+            for key, _, _, fut in leaders:
+                STATS.incr("errors", key)
+                GUARD.breaker(key_family(key)).release_probe()
+                INFLIGHT.resolve(key, fut, error=e)
+        for (key, url, check_final, fut), res in zip(leaders, results):
+            STATS.incr("misses", key)
+            try:
+                observe_upstream(key, res.status or "error", res.elapsed, res.attempts - 1)
+                GUARD.record(key_family(key), res.status, retry_after_seconds(res.headers.get("Retry-After")))
+                if res.error is not None:
+                    raise RuntimeError(res.error)
+                if res.status != 304 and not 200 <= res.status < 300:
+                    raise RuntimeError(f"HTTP {res.status} for {url}")
+                data = _store_response(key, check_final, res.status, res.headers, res.body)
+                if data is None:
+                    data = _load_upstream(key, url, check_final)
+                INFLIGHT.resolve(key, fut, data)
+            except Exception as e:
+                STATS.incr("errors", key)
+                INFLIGHT.resolve(key, fut, error=e)
+    elif leaders:
+        def run(key, url, check_final, fut):
+            STATS.incr("misses", key)
+            try:
+                INFLIGHT.resolve(key, fut, _load_upstream(key, url, check_final))
+            except Exception as e:
+                STATS.incr("errors", key)
+                INFLIGHT.resolve(key, fut, error=e)
+        for leader in leaders:
+            executor.submit(run, *leader)
+
+    deadline = time.time() + timeout
+    with timing.phase("wait"):
+        for key, fut in waiting.items():
+            try:
+                out[key] = (fut.result(max(0, deadline - time.time())), None)
+                continue
+            except FutureTimeout:
+                error = "timeout"
+            except Exception as e:
+                error = str(e)
+            stale = serve_stale(key)
+            out[key] = (stale, None) if stale is not None else (None, error)
+    return out
+
+def fetch_multiple_boxscores(game_ids, timeout=10):
+    """Fetch multiple boxscores concurrently; results keep the input order."""
+    items = [(f"box:{gid}", CDN_BOXSCORE.format(gid=gid), 10, True) for gid in game_ids]
+    fetched = fetch_json_many(items, timeout=timeout)
+    results = []
+    for gid in game_ids:
+        data, error = fetched[f"box:{gid}"]
+        results.append({"gameId": gid, "data": data, "error": error})
     return results
 
+# ---------------- Game cards ----------------
+CARDS_FINAL_TTL = 24 * 3600  # A past date whose games are all final never changes
+
+def game_card(game_id, box, sched_meta, date_iso):
+    """Summary for one game card: status, clock, period, teams, scores, arena.
+    Falls back to schedule metadata when the boxscore isn't published yet."""
+    game = (box or {}).get("game") or {}
+    if game:
+        h, a = game.get("homeTeam") or {}, game.get("awayTeam") or {}
+        period_raw = game.get("period")
+        arena = game.get("arena") or {}
+        return {
+            "gameId": game.get("gameId") or game_id,
+            "statusText": game.get("gameStatusText"),
+            "gameClock": game.get("gameClock"),
+            "period": period_raw.get("current") if isinstance(period_raw, dict) else period_raw,
+            "startDate": date_iso,
+            "arena": arena.get("arenaName"),
+            "city": arena.get("arenaCity"),
+            "home": {"teamId": h.get("teamId"), "triCode": h.get("teamTricode"), "score": h.get("score")},
+            "away": {"teamId": a.get("teamId"), "triCode": a.get("teamTricode"), "score": a.get("score")},
+        }
+    if sched_meta:
+        h, a = sched_meta["homeTeam"], sched_meta["awayTeam"]
+        return {
+            "gameId": game_id,
+            "statusText": sched_meta.get("gameStatusText"),
+            "gameClock": None,
+            "period": None,
+            "startDate": date_iso,
+            "arena": sched_meta.get("arenaName"),
+            "city": sched_meta.get("arenaCity"),
+            "home": {"teamId": h["teamId"], "triCode": h["teamTricode"], "score": None},
+            "away": {"teamId": a["teamId"], "triCode": a["teamTricode"], "score": None},
+        }
+    return None
+
+def build_date_cards(date_iso):
+    """Cards for every game around date_iso, from one concurrent boxscore pass.
+    Returns (payload, immutable)."""
+    index = get_schedule_index()
+    gids = schedule_game_ids_for_date(index, date_iso, fuzzy_days=1)
+    cards, complete, all_final = [], True, True
+    for result in fetch_multiple_boxscores(gids):
+        card = game_card(result["gameId"], result["data"], index["games"].get(result["gameId"]), date_iso)
+        complete = complete and result["error"] is None
+        if card is not None:
+            cards.append(card)
+            # Same rule as the cache policy, so "Final/OT" counts as final
+            state = cache_policy.game_state(cache_policy.game_facts(result["data"]))
+            all_final = all_final and state == "final"
+
+    base = dt.datetime.strptime(date_iso, "%Y-%m-%d").date()
+    past = base + dt.timedelta(days=1) < dt.date.today()  # Whole fuzzy window is over
+    immutable = past and complete and all_final
+    return {"date": date_iso, "gameIds": gids, "games": cards}, immutable
+
+def get_date_cards(date_iso):
+    """Cached cards for a date: 10s while anything can change, a day once immutable."""
+    key = f"cards:{date_iso}"
+    ttl = CARDS_FINAL_TTL if CACHE.is_final(key) else 10
+    payload = cache_get(key, ttl)
+    if payload is not None:
+        STATS.incr("hits", key)
+        return payload, CACHE.is_final(key)
+
+    def build():
+        payload, immutable = build_date_cards(date_iso)
+        cache_set(key, payload, is_final=immutable)
+        return payload, immutable
+
+    (payload, immutable), _ = INFLIGHT.do(key, build)
+    return payload, immutable
+
+# ---------------- Composite dashboard ----------------
+def _dashboard_player(p):
+    """Player row in the dashboard's normalized shape."""
+    s = p.get("statistics") or {}
+    return {
+        "playerId": p.get("personId"),
+        "jerseyNum": p.get("jerseyNum"),
+        "name": p.get("name"),
+        "position": p.get("position"),
+        "starter": p.get("starter") == "1",
+        "oncourt": p.get("oncourt") == "1",
+        "stats": {
+            "pts": s.get("points"),
+            "reb": s.get("reboundsTotal", s.get("rebounds") or None),
+            "ast": s.get("assists"),
+            "stl": s.get("steals"),
+            "blk": s.get("blocks"),
+            "tov": s.get("turnovers"),
+            "pf": s.get("foulsPersonal"),
+            "fgm": s.get("fieldGoalsMade"), "fga": s.get("fieldGoalsAttempted"), "fgPct": s.get("fieldGoalsPercentage"),
+            "ftm": s.get("freeThrowsMade"), "fta": s.get("freeThrowsAttempted"), "ftPct": s.get("freeThrowsPercentage"),
+            "tpm": s.get("threePointersMade"), "tpa": s.get("threePointersAttempted"), "tpPct": s.get("threePointersPercentage"),
+            "plusMinus": s.get("plusMinusPoints"),
+            "minutes": s.get("minutes", s.get("minutesCalculated")),
+        },
+    }
+
+def _dashboard_team(t):
+    return {
+        "teamId": t.get("teamId"),
+        "triCode": t.get("teamTricode"),
+        "score": t.get("score"),
+        "periods": t.get("periods") or [],
+        "totals": t.get("statistics") or {},
+        "players": [_dashboard_player(p) for p in t.get("players") or []],
+    }
+
+def build_dashboard(game_id, box, pbp, pbp_rev=None):
+    """Everything the game page needs on first load (logo/headshot URLs are
+    added by the client, which knows its own API base). pbp_rev is the
+    action index cursor matching pbp, the client's first ?after= value."""
+    game = (box or {}).get("game") or {}
+    arena = game.get("arena") or {}
+    period = game.get("period")
+    actions = ((pbp or {}).get("game") or {}).get("actions") or []
+    return {
+        "meta": {
+            "gameId": game_id,
+            "statusText": game.get("gameStatusText"),
+            "gameClock": game.get("gameClock"),
+            "period": period.get("current") if isinstance(period, dict) else period,
+            "attendance": game.get("attendance"),
+            "arena": {
+                "name": arena.get("arenaName"),
+                "city": arena.get("arenaCity"),
+                "state": arena.get("arenaState"),
+                "tz": arena.get("arenaTimezone"),
+            },
+        },
+        "teams": {
+            "home": _dashboard_team(game.get("homeTeam") or {}),
+            "away": _dashboard_team(game.get("awayTeam") or {}),
+        },
+        "playByPlay": actions,
+        "pbpRev": pbp_rev,
+    }
+
+# ---------------- Play-by-play action index (see action_index.py) ----------------
+ACTION_INDEXES = ActionIndexRegistry()
+
+# ---------------- Live game streams (SSE) ----------------
+STREAM_POLL_INTERVAL = float(os.environ.get("STREAM_POLL_INTERVAL", 3))
+
+def _stream_poll(game_id, state):
+    """
+    One poll of a game for its stream: refresh boxscore/pbp through the
+    cache and turn what changed into events. The first poll emits a
+    snapshot; later ones emit "poll" deltas and "pbp" increments.
+    """
+    box, _ = fetch_json_throttled(f"box:{game_id}", CDN_BOXSCORE.format(gid=game_id), ttl=10, check_final=True)
+    view = cached_view(f"box:{game_id}", "poll", box, lambda data: poll_view(game_id, data))
+    slim, etag = view["slim"], view["etag"]
+
+    index = ACTION_INDEXES.get(game_id)
+    prev = index.cursor
+    try:
+        pbp_data, _ = fetch_json_throttled(f"pbp:{game_id}", CDN_PBP.format(gid=game_id), ttl=10, check_final=True)
+        pbp_changed = index.update(pbp_data)
+    except Exception:
+        pbp_changed = False  # Play-by-play is often missing pregame
+
+    events = []
+    if state is None:
+        events.append(("snapshot", {"etag": etag, "poll": slim, "rev": index.cursor}))
+    else:
+        if etag != state["etag"]:
+            events.append(("poll", {**diff_poll_snapshots(state["slim"], slim, state["etag"]), "etag": etag}))
+        if pbp_changed:
+            inc = index.since(prev)
+            if inc["actions"] or inc["removed"]:
+                events.append(("pbp", inc))
+
+    done = game_policy(game_id).state == "final"
+    return {"etag": etag, "slim": slim, "rev": index.cursor}, events, done
+
+def _stream_snapshot(state):
+    return "snapshot", {"etag": state["etag"], "poll": state["slim"], "rev": state["rev"]}
+
+# Every open stream holds one of gunicorn's --threads; keep the rest for other routes
+STREAM_MAX_SUBSCRIBERS = int(os.environ.get("STREAM_MAX_SUBSCRIBERS", 8))
+STREAMS = StreamHub(_stream_poll, _stream_snapshot, interval=STREAM_POLL_INTERVAL,
+                    max_subscribers=STREAM_MAX_SUBSCRIBERS)
+
+# ---------------- Live-game prefetch ----------------
+# Off by default (set PREFETCH=1, as render.yaml does); each worker keeps its own cache warm,
+# and with the sqlite backend the fetch leases keep workers from doubling up.
+PREFETCH_ENABLED = os.environ.get("PREFETCH", "0") == "1"
+PREFETCH_INTERVAL = float(os.environ.get("PREFETCH_INTERVAL", 5))
+PREFETCH_BUDGET = int(os.environ.get("PREFETCH_BUDGET", 240))  # Upstream requests per minute
+PREFETCH_LEAD = dt.timedelta(minutes=int(os.environ.get("PREFETCH_LEAD_MINUTES", 15)))
+PREFETCH_AHEAD = 2  # Refresh this many seconds before the policy TTL so viewers always hit
+PREFETCH_WINDOW = dt.timedelta(hours=4)  # Scheduled games this far past tip may still be on
+
+def _parse_utc(value):
+    try:
+        return dt.datetime.strptime(value or "", "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc)
+    except ValueError:
+        return None
+
+def prefetch_discover():
+    """Live games first, then games tipping off within PREFETCH_LEAD. The
+    schedule covers games the scoreboard hasn't rolled over to yet."""
+    now = dt.datetime.now(dt.timezone.utc)
+    live, soon = [], []
+
+    sb, _ = fetch_json_throttled("scoreboard:today", CDN_SCOREBOARD_TODAY, ttl=12, stale_ttl=30)
+    seen = set()
+    for g in (sb.get("scoreboard") or {}).get("games", []):
+        gid, status = g.get("gameId"), g.get("gameStatus")
+        seen.add(gid)
+        tip = _parse_utc(g.get("gameTimeUTC"))
+        if status == 2:
+            live.append(gid)
+        elif status == 1 and tip is not None and tip - now <= PREFETCH_LEAD:
+            soon.append((tip, gid))
+
+    index = get_schedule_index()
+    for day in (now.date() - dt.timedelta(days=1), now.date()):
+        for gid in index["by_date"].get(day, []):
+            tip = _parse_utc(index["games"][gid].get("gameDateTimeUTC"))
+            if gid not in seen and tip is not None and -PREFETCH_WINDOW <= tip - now <= PREFETCH_LEAD:
+                soon.append((tip, gid))
+
+    return live + [gid for _, gid in sorted(soon)]
+
+def prefetch_cost(game_id):
+    """Upstream requests needed to bring a game's boxscore/pbp up to date."""
+    policy = game_policy(game_id)
+    if policy.state == "final":
+        return 0
+    cutoff = time.time() - max(policy.ttl - PREFETCH_AHEAD, 1)
+    return sum(CACHE.stamp(key)[0] < cutoff for key in (f"box:{game_id}", f"pbp:{game_id}"))
+
+def prefetch_refresh(game_ids):
+    """Refresh the games in one concurrent batch; returns the ones now final."""
+    items = []
+    for gid in game_ids:
+        items.append((f"box:{gid}", CDN_BOXSCORE.format(gid=gid), 10, True))
+        items.append((f"pbp:{gid}", CDN_PBP.format(gid=gid), 10, True))
+    fetch_json_many(items, stale_ttl=0, ahead=PREFETCH_AHEAD)  # Errors just leave the game due next tick
+    return {gid for gid in game_ids if CACHE.is_final(f"box:{gid}")}
+
+PREFETCH = PrefetchScheduler(prefetch_discover, prefetch_cost, prefetch_refresh,
+                             interval=PREFETCH_INTERVAL, budget_per_min=PREFETCH_BUDGET)
+if PREFETCH_ENABLED:
+    PREFETCH.start()
+
+# ---------------- Warm start ----------------
+# At boot the last cache snapshot is restored and the schedule + today's
+# scoreboard are loaded in the background; /health/ready answers 503 until
+# that is done. The cache is snapshotted every SNAPSHOT_INTERVAL seconds
+# and at exit. WARM_START=0 turns all of it off.
+WARM_START = os.environ.get("WARM_START", "1") == "1"
+SNAPSHOT_INTERVAL = int(os.environ.get("SNAPSHOT_INTERVAL", 300))
+SNAPSHOT_PATH = snapshot.snapshot_path()
+READY = threading.Event()
+WARMUP = {"restored": 0, "seconds": None, "errors": []}
+
+def save_snapshot():
+    try:
+        return snapshot.save(CACHE, SNAPSHOT_PATH, {"schedule_version": SCHEDULE_HINT["version"]})
+    except OSError:
+        return None  # Best effort; the next interval tries again
+
+def warm_up():
+    """Restore the last snapshot, then load what the first requests need."""
+    start = time.time()
+    try:
+        WARMUP["restored"], meta = snapshot.restore(CACHE, SNAPSHOT_PATH)
+        SCHEDULE_HINT["version"] = SCHEDULE_HINT["version"] or meta.get("schedule_version")
+        steps = (
+            ("schedule", get_schedule_index),
+            ("scoreboard", lambda: fetch_json_throttled("scoreboard:today", CDN_SCOREBOARD_TODAY, ttl=12, stale_ttl=30)),
+        )
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                WARMUP["errors"].append(f"{name}: {e}")
+    finally:
+        WARMUP["seconds"] = round(time.time() - start, 3)
+        READY.set()  # Serve anyway; a failed step just leaves that data cold
+
+def _snapshot_loop():
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL)
+        save_snapshot()
+
+if WARM_START:
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    threading.Thread(target=_snapshot_loop, name="snapshot", daemon=True).start()
+    atexit.register(save_snapshot)
+else:
+    READY.set()
+
 # ===================== ROUTES =====================
 
 @app.get("/health")
 def health():
-    return jsonify({"ok": True, "cache_enabled": True, "compression": True})
+    return jsonify({"ok": True, "ready": READY.is_set(), "warmup": WARMUP,
+                    "cache_enabled": True, "compression": True})
+
+@app.get("/health/ready")
+def health_ready():
+    """503 until the boot warm-up has finished (for deploy health checks)."""
+    if not READY.is_set():
+        return jsonify({"ok": False, "ready": False}), 503
+    return jsonify({"ok": True, "ready": True})
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Cache hit/miss/coalesced/stale counters for upstream fetches."""
+    out = STATS.snapshot()
+    out["in_flight"] = INFLIGHT.in_flight()
+    out["store"] = CACHE.stats()
+    out["streams"] = STREAMS.stats()
+    out["prefetch"] = PREFETCH.stats()
+    out["archive"] = ARCHIVE.stats() if ARCHIVE is not None else None
+    out["upstream"] = GUARD.stats()
+    out["assets"] = ASSETS.stats()
+    resp = make_response(jsonify(out))
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: route/upstream histograms, cache events per
+    key family, cache size, in-flight and queued work."""
+    store, streams, prefetch, guard = CACHE.stats(), STREAMS.stats(), PREFETCH.stats(), GUARD.stats()
+    body = metrics.render(
+        HTTP_LATENCY.render(), HTTP_RESPONSES.render(),
+        UPSTREAM_LATENCY.render(), UPSTREAM_RESPONSES.render(), UPSTREAM_RETRIES.render(),
+        metrics.gauge("nba_cache_events_total", "Cache lookups and refreshes by key family",
+                      STATS.families(), ("family", "event"), kind="counter"),
+        metrics.gauge("nba_cache_entries", "Entries in the cache", {(): store["entries"]}),
+        metrics.gauge("nba_cache_bytes", "Estimated cache size", {(): store["bytes"]}),
+        metrics.gauge("nba_cache_evictions_total", "Entries evicted for space", {(): store["evictions"]}, kind="counter"),
+        metrics.gauge("nba_upstream_breaker_state", "Circuit breaker per key family (0 closed, 1 half-open, 2 open)",
+                      {(family,): state for family, state in GUARD.states().items()}, ("family",)),
+        metrics.gauge("nba_upstream_throttled_total", "CDN requests refused by the request budget",
+                      {(): guard["throttled"]}, kind="counter"),
+        metrics.gauge("nba_upstream_delayed_total", "CDN requests that queued for a request budget token",
+                      {(): guard["delayed"]}, kind="counter"),
+        metrics.gauge("nba_inflight_fetches", "Upstream fetches in flight (single-flight keys)", {(): INFLIGHT.in_flight()}),
+        metrics.gauge("nba_executor_queue_depth", "Tasks waiting for the thread pool", {(): executor._work_queue.qsize()}),
+        metrics.gauge("nba_stream_subscribers", "Open SSE connections", {(): streams["subscribers"]}),
+        metrics.gauge("nba_prefetch_active_games", "Games the prefetcher keeps warm", {(): prefetch["active"]}),
+        metrics.gauge("nba_ready", "1 once the boot warm-up finished", {(): int(READY.is_set())}),
+    )
+    resp = Response(body, mimetype="text/plain; version=0.0.4")
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+@app.get("/admin/profiles")
+def admin_profiles():
+    """Recent cProfile results (top functions by cumulative time). Needs
+    X-Admin-Token; closed entirely while ADMIN_TOKEN isn't configured."""
+    if not ADMIN_TOKEN or not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "forbidden", "detail": "X-Admin-Token required (set ADMIN_TOKEN to enable)"}), 403
+    resp = make_response(jsonify({"sample_rate": PROFILER.sample_rate, "profiles": PROFILER.snapshot()}))
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
 @app.get("/scoreboard")
 def scoreboard():
-    """Today's live scoreboard or gameIds for a specific date."""
+    """
+    Today's live scoreboard or gameIds for a specific date.
+    With ?date=YYYY-MM-DD&cards=1 the date response also carries ready-made
+    game cards ("games"), so clients don't fetch every boxscore themselves.
+    """
     date_iso = request.args.get("date")
+    if date_iso and request.args.get("cards") in ("1", "true"):
+        try:
+            payload, immutable = get_date_cards(date_iso)
+        except Exception as e:
+            return jsonify({"date": date_iso, "gameIds": [], "games": [], "error": str(e)}), 200
+        view = cached_view(f"cards:{date_iso}", "json", payload, json_view)
+        policy = cache_policy.POLICIES["final"] if immutable else cache_policy.DEFAULT
+        return view_response(view, policy.cache_control)
     if date_iso:
         try:
-            sched = get_schedule_cached()
-            gids = schedule_game_ids_for_date(sched, date_iso, fuzzy_days=1)
+            gids = schedule_game_ids_for_date(get_schedule_index(), date_iso, fuzzy_days=1)
             resp = make_response(jsonify({"date": date_iso, "gameIds": gids}))
             resp.headers["Cache-Control"] = "public, max-age=60"
             return resp
         except Exception as e:
             return jsonify({"date": date_iso, "gameIds": [], "error": str(e)}), 200
 
-    data, from_cache = fetch_json_throttled("scoreboard:today", CDN_SCOREBOARD_TODAY, ttl=12)
-    resp = make_response(jsonify(data))
-    resp.headers["Cache-Control"] = "public, max-age=10, stale-while-revalidate=30"
+    data, from_cache = fetch_json_throttled("scoreboard:today", CDN_SCOREBOARD_TODAY, ttl=12, stale_ttl=30)
+    view = cached_view("scoreboard:today", "json", data, json_view)
+    return view_response(view, "public, max-age=10, stale-while-revalidate=30")
+
+@app.get("/schedule/team/<int:team_id>")
+def schedule_team(team_id):
+    """
+    A team's scheduled games, optionally limited to a date range.
+    Usage: /schedule/team/1610612747?from=2025-01-01&to=2025-01-31
+    """
+    try:
+        index = get_schedule_index()
+    except Exception as e:
+        return jsonify({"error": "schedule_unavailable", "teamId": team_id, "detail": str(e)}), 502
+
+    games = [index["games"][gid] for gid in index["by_team"].get(team_id, [])]
+    lo, hi = request.args.get("from"), request.args.get("to")
+    if lo:
+        games = [g for g in games if g["date"] >= lo]
+    if hi:
+        games = [g for g in games if g["date"] <= hi]
+
+    resp = make_response(jsonify({"teamId": team_id, "games": games}))
+    resp.headers["Cache-Control"] = "public, max-age=3600"
+    return resp
+
+@app.get("/schedule/game/<game_id>")
+def schedule_game(game_id):
+    """Scheduled metadata for one game (teams, tip-off, arena)."""
+    try:
+        index = get_schedule_index()
+    except Exception as e:
+        return jsonify({"error": "schedule_unavailable", "gameId": game_id, "detail": str(e)}), 502
+
+    meta = index["games"].get(game_id)
+    if meta is None:
+        return jsonify({"error": "unknown_game", "gameId": game_id}), 404
+
+    resp = make_response(jsonify(meta))
+    resp.headers["Cache-Control"] = "public, max-age=3600"
     return resp
 
 @app.get("/game/<game_id>/boxscore")
 def boxscore(game_id):
-    """Raw boxscore with smart caching for final games."""
+    """
+    Raw boxscore, cached per the game's state (see cache_policy.py).
+    ?fields=game.gameStatusText,game.homeTeam.players.statistics.points
+    returns only those fields (see projection.py).
+    """
     url = CDN_BOXSCORE.format(gid=game_id)
     try:
         data, from_cache = fetch_json_throttled(f"box:{game_id}", url, ttl=10, check_final=True)
-        resp = make_response(jsonify(data))
-        
-        # Final games can be cached longer
-        game = data.get("game", {})
-        is_final = game.get("gameStatusText", "").lower() == "final"
-        
-        if is_final:
-            resp.headers["Cache-Control"] = "public, max-age=3600"  # 1 hour
-        else:
-            resp.headers["Cache-Control"] = "public, max-age=8, stale-while-revalidate=20"
-        
-        return resp
+        view = document_view(f"box:{game_id}", data)
+        return view_response(view, game_policy(game_id).cache_control)
+    except FieldSpecError as e:
+        return jsonify({"error": "bad_fields", "gameId": game_id, "detail": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "upstream_boxscore_failed", "gameId": game_id, "detail": str(e)}), 502
 
 @app.get("/game/<game_id>/pbp")
 def pbp(game_id):
-    """Raw play-by-play with smart caching."""
+    """
+    Raw play-by-play with smart caching.
+    With ?after=<rev> only actions added, edited or removed since that
+    cursor are returned, plus the rev to send next time (see
+    action_index.py; "reset": true means the list is complete).
+    ?fields=game.actions.clock,description,scoreHome projects the full document.
+    """
     url = CDN_PBP.format(gid=game_id)
+    after = request.args.get("after")
     try:
         data, from_cache = fetch_json_throttled(f"pbp:{game_id}", url, ttl=10, check_final=True)
-        resp = make_response(jsonify(data))
-        resp.headers["Cache-Control"] = "public, max-age=8, stale-while-revalidate=20"
-        return resp
+        if after is not None:
+            index = ACTION_INDEXES.get(game_id)
+            index.update(data)
+            resp = make_response(jsonify({"gameId": game_id, "after": after, **index.since(after)}))
+            resp.headers["Cache-Control"] = game_policy(game_id).cache_control
+            return resp
+        view = document_view(f"pbp:{game_id}", data)
+        return view_response(view, game_policy(game_id).cache_control)
+    except FieldSpecError as e:
+        return jsonify({"error": "bad_fields", "gameId": game_id, "detail": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "upstream_pbp_failed", "gameId": game_id, "detail": str(e)}), 502
 
+@app.get("/game/<game_id>/dashboard")
+def game_dashboard(game_id):
+    """
+    Boxscore + play-by-play in one normalized payload, for the first load
+    of the game page. Built once per (boxscore, pbp) version.
+    """
+    box_key, pbp_key = f"box:{game_id}", f"pbp:{game_id}"
+    # Read the pbp version before fetching: if it changes underneath us the
+    # next request sees a new version and rebuilds, never the other way round
+    _, pbp_version = CACHE.stamp(pbp_key)
+    results = fetch_json_many([
+        (box_key, CDN_BOXSCORE.format(gid=game_id), 10, True),
+        (pbp_key, CDN_PBP.format(gid=game_id), 10, True),
+    ])
+    box, error = results[box_key]
+    if error is not None:
+        return jsonify({"error": "upstream_boxscore_failed", "gameId": game_id, "detail": str(error)}), 502
+    pbp, pbp_error = results[pbp_key]  # PBP might be empty pregame
+    if pbp_error is not None:
+        pbp_version = "none"
+    elif pbp_version is None:
+        _, pbp_version = CACHE.stamp(pbp_key)  # First fetch of this game's pbp
+
+    def build(b):
+        pbp_rev = None  # No cursor: the first ?after= poll gets the full list
+        if pbp is not None:
+            index = ACTION_INDEXES.get(game_id)
+            index.update(pbp)
+            pbp_rev = index.cursor
+        return json_view(build_dashboard(game_id, b, pbp, pbp_rev))
+    view = cached_view(box_key, f"dashboard:{pbp_version}", box, build)
+    return view_response(view, game_policy(game_id).cache_control)
+
 # NEW: Batch endpoint for fetching multiple games at once
+BATCH_MAX_IDS = 120   # A full week of games
+BATCH_MAX_DATES = 7
+
 @app.get("/games/batch")
 def batch_games():
     """
     Fetch multiple boxscores concurrently.
     Usage: /games/batch?ids=0022400001,0022400002,0022400003
+           /games/batch?dates=2025-01-14,2025-01-15  (every game on those dates)
+    Games that fail or time out come back with an "error" instead of failing the batch.
     """
     ids_param = request.args.get("ids", "")
-    if not ids_param:
+    dates_param = request.args.get("dates", "")
+    if not ids_param and not dates_param:
         return jsonify({"error": "No game IDs provided", "games": []}), 400
     
     game_ids = [gid.strip() for gid in ids_param.split(",") if gid.strip()]
+
+    dates = [d.strip() for d in dates_param.split(",") if d.strip()]
+    if len(dates) > BATCH_MAX_DATES:
+        return jsonify({"error": f"Too many dates (max {BATCH_MAX_DATES})", "games": []}), 400
+    if dates:
+        try:
+            index = get_schedule_index()
+            for d in dates:
+                game_ids.extend(schedule_game_ids_for_date(index, d, fuzzy_days=0))
+        except Exception as e:
+            return jsonify({"error": "schedule_unavailable", "detail": str(e), "games": []}), 502
+    game_ids = list(dict.fromkeys(game_ids))
     
-    if len(game_ids) > 15:
-        return jsonify({"error": "Too many IDs (max 15)", "games": []}), 400
+    if len(game_ids) > BATCH_MAX_IDS:
+        return jsonify({"error": f"Too many IDs (max {BATCH_MAX_IDS})", "games": []}), 400
     
     results = fetch_multiple_boxscores(game_ids)
     
@@ -300,41 +1374,152 @@ def batch_games():
     resp.headers["Cache-Control"] = "public, max-age=8"
     return resp
 
-# Asset redirects with cache headers
+# ---------------- Assets (logos, headshots) ----------------
+# Served from a local copy (see assets.py) instead of redirecting every
+# <img> to the CDN. If the CDN can't be reached and there is no copy yet,
+# the routes fall back to the old 302 so images still load.
+ASSET_CACHE_CONTROL = "public, max-age=604800, immutable"  # 7 days
+MAX_HEADSHOTS = 60
+
+def _fetch_asset(url):
+    r = upstream_get("asset", url)
+    if r.status_code in (403, 404):
+        return None
+    r.raise_for_status()
+    return r.content
+
+ASSETS = make_asset_store(_fetch_asset)
+SPRITE = {"key": None, "asset": None}  # Last logo sprite and the logo ETags it was built from
+SPRITE_LOCK = threading.Lock()
+
+def _load_asset(name, url):
+    """Fetch name once per flight; a flight that just finished counts as fresh."""
+    def load():
+        asset, fresh = ASSETS.get(name)
+        return asset if fresh else ASSETS.load(name, url)
+    asset, _ = INFLIGHT.do(f"asset:{name}", load)
+    return asset
+
+def get_assets(items, timeout=10):
+    """{name: Asset or None} for (name, url) pairs. Stored copies are used
+    as-is; missing or expired ones are fetched concurrently. None means the
+    fetch failed with nothing stored; Asset.body is None when the CDN has no
+    such asset."""
+    out, futures = {}, {}
+    for name, url in items:
+        asset, fresh = ASSETS.get(name)
+        out[name] = asset
+        if not fresh:
+            futures[name] = executor.submit(_load_asset, name, url)
+    deadline = time.time() + timeout
+    for name, fut in futures.items():
+        try:
+            out[name] = fut.result(max(0, deadline - time.time()))
+        except Exception:
+            pass  # Keep the expired copy, if there is one
+    return out
+
+def asset_response(asset, cache_control=ASSET_CACHE_CONTROL):
+    """The asset's bytes with a strong ETag, or 304 when the client has them."""
+    if asset.etag in client_etags():
+        resp = make_response("", 304)
+    else:
+        resp = make_response(asset.body)
+        resp.mimetype = asset.content_type
+    resp.set_etag(asset.etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+def _serve_asset(name, url, kind, id_field, id_value):
+    asset = get_assets([(name, url)])[name]
+    if asset is None:
+        resp = redirect(url, code=302)  # CDN unreachable and no local copy
+        resp.headers["Cache-Control"] = "public, max-age=60"
+        return resp
+    if asset.body is None:
+        resp = make_response(jsonify({"error": f"{kind}_not_found", id_field: id_value}), 404)
+        resp.headers["Cache-Control"] = "public, max-age=3600"
+        return resp
+    return asset_response(asset)
+
 @app.get("/assets/team-logo/<int:team_id>")
 def team_logo(team_id):
-    resp = redirect(TEAM_LOGO.format(teamId=team_id), code=302)
-    resp.headers["Cache-Control"] = "public, max-age=86400"  # 24 hours
-    return resp
+    return _serve_asset(f"logo_{team_id}.svg", TEAM_LOGO.format(teamId=team_id), "logo", "teamId", team_id)
 
 @app.get("/assets/player-headshot/<int:player_id>")
 def player_headshot(player_id):
-    resp = redirect(PLAYER_HEADSHOT.format(playerId=player_id), code=302)
-    resp.headers["Cache-Control"] = "public, max-age=86400"  # 24 hours
-    return resp
+    return _serve_asset(f"headshot_{player_id}.png", PLAYER_HEADSHOT.format(playerId=player_id),
+                        "headshot", "playerId", player_id)
 
-# Optimized poll endpoint
-@app.get("/poll/game/<game_id>")
-def poll_game(game_id):
+@app.get("/assets/team-logos.svg")
+def team_logo_sprite():
     """
-    Slim payload with ETag/304 support.
-    Final games return longer cache headers.
+    All 30 team logos in one SVG; <img src=".../team-logos.svg#team-<teamId>">
+    shows a single team. Rebuilt only when a logo changes. Immutable once
+    every logo is in; a partial sprite is only cached briefly.
+    """
+    names = [(tid, f"logo_{tid}.svg") for tid in TEAM_IDS]
+    logos = get_assets([(name, TEAM_LOGO.format(teamId=tid)) for tid, name in names])
+    key = tuple(logos[name].etag if logos[name] is not None else None for _, name in names)
+    with SPRITE_LOCK:
+        if SPRITE["key"] != key:
+            body = build_logo_sprite([(tid, logos[name]) for tid, name in names])
+            SPRITE.update(key=key, asset=make_asset("team-logos.svg", body))
+        sprite = SPRITE["asset"]
+    complete = all(logos[name] is not None for _, name in names)
+    return asset_response(sprite, ASSET_CACHE_CONTROL if complete else "public, max-age=300")
+
+@app.get("/assets/player-headshots")
+def player_headshot_manifest():
+    """
+    Headshots as data: URIs in one response, for ?ids=<playerId>,... and/or
+    every player in ?game=<gameId>'s boxscore: {"headshots": {"<playerId>":
+    uri or null}}. null means no headshot (or the CDN failed); the client
+    falls back to /assets/player-headshot/<id>.
     """
     try:
-        url = CDN_BOXSCORE.format(gid=game_id)
-        box, from_cache = fetch_json_throttled(f"box:{game_id}", url, ttl=10, check_final=True)
-    except Exception as e:
-        return jsonify({"error": "upstream_boxscore_failed", "gameId": game_id, "detail": str(e)}), 502
+        ids = [int(x) for x in (request.args.get("ids") or "").split(",") if x.strip()]
+    except ValueError:
+        return jsonify({"error": "bad_ids", "detail": "ids must be comma-separated player ids"}), 400
+    game_id = request.args.get("game")
+    if game_id:
+        try:
+            box, _ = fetch_json_throttled(f"box:{game_id}", CDN_BOXSCORE.format(gid=game_id), ttl=10, check_final=True)
+        except Exception as e:
+            return jsonify({"error": "upstream_boxscore_failed", "gameId": game_id, "detail": str(e)}), 502
+        game = box.get("game") or {}
+        for team in (game.get("homeTeam") or {}, game.get("awayTeam") or {}):
+            ids += [p["personId"] for p in team.get("players") or [] if p.get("personId")]
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_HEADSHOTS:
+        return jsonify({"error": "too_many_ids", "detail": f"at most {MAX_HEADSHOTS} players"}), 400
+
+    names = {pid: f"headshot_{pid}.png" for pid in ids}
+    assets = get_assets([(name, PLAYER_HEADSHOT.format(playerId=pid)) for pid, name in names.items()])
+
+    def build(_box):
+        return json_view({"headshots": {
+            str(pid): data_uri(assets[name]) if assets[name] is not None and assets[name].body is not None else None
+            for pid, name in names.items()
+        }})
+    if game_id:
+        # Memoized on the game's boxscore entry, per set of headshot versions,
+        # so the body (base64, encode, compress) is charged to the cache budget
+        version = stable_hash([[pid, assets[name].etag if assets[name] is not None else None]
+                               for pid, name in names.items()])
+        view = cached_view(f"box:{game_id}", f"headshots:{version}", box, build)
+    else:
+        view = build(None)
+    complete = all(a is not None for a in assets.values())
+    return view_response(view, "public, max-age=86400" if complete else "public, max-age=60")
 
+# ---------------- Poll snapshots + deltas ----------------
+def build_poll_snapshot(game_id, box):
+    """Slim poll payload (status, scores, per-player points) from a boxscore."""
     game = (box or {}).get("game") or {}
 
     if not isinstance(game, dict) or not game:
-        slim = {"gameId": game_id, "status": None, "scores": None, "players": {"home": [], "away": []}}
-        etag = stable_hash(slim)
-        resp = make_response(jsonify(slim), 200)
-        resp.headers["ETag"] = etag
-        resp.headers["Cache-Control"] = "public, max-age=8"
-        return resp
+        return {"gameId": game_id, "status": None, "scores": None, "players": {"home": [], "away": []}}
 
     h = game.get("homeTeam") or {}
     a = game.get("awayTeam") or {}
@@ -355,13 +1540,10 @@ def poll_game(game_id):
             })
         return out
 
-    status_text = game.get("gameStatusText", "")
-    is_final = status_text.lower() == "final"
-
-    slim = {
+    return {
         "gameId": game_id,
         "status": {
-            "gameStatusText": status_text,
+            "gameStatusText": game.get("gameStatusText", ""),
             "gameClock": game.get("gameClock"),
             "period": period_current,
         },
@@ -372,31 +1554,151 @@ def poll_game(game_id):
         "players": {"home": player_snap(h), "away": player_snap(a)},
     }
 
+def diff_poll_snapshots(old, new, base_etag):
+    """
+    Only what changed between two slim snapshots: changed status keys,
+    changed team scores and player rows that are new or differ.
+    Unchanged sections are left out entirely.
+    """
+    out = {"gameId": new["gameId"], "delta": True, "base": base_etag}
+
+    old_status, new_status = old.get("status") or {}, new.get("status") or {}
+    status = {k: v for k, v in new_status.items() if old_status.get(k) != v}
+    if status:
+        out["status"] = status
+
+    old_scores, new_scores = old.get("scores") or {}, new.get("scores") or {}
+    scores = {side: v for side, v in new_scores.items() if old_scores.get(side) != v}
+    if scores:
+        out["scores"] = scores
+
+    players = {}
+    for side in ("home", "away"):
+        before = {p["playerId"]: p for p in (old.get("players") or {}).get(side, [])}
+        changed = [p for p in (new.get("players") or {}).get(side, []) if before.get(p["playerId"]) != p]
+        if changed:
+            players[side] = changed
+    if players:
+        out["players"] = players
+    return out
+
+def poll_view(game_id, box):
+    """Slim snapshot, its ETag and serialized body; built once per boxscore version."""
+    with timing.phase("project"):
+        slim = build_poll_snapshot(game_id, box)
     etag = stable_hash(slim)
-    
-    inm = request.headers.get("If-None-Match")
-    if inm and inm == etag:
-        return ("", 304)
+    with timing.phase("encode"):
+        body = codec.dumps(slim)
+    return {"slim": slim, "etag": etag, "body": body}
 
-    resp = make_response(jsonify(slim), 200)
-    resp.headers["ETag"] = etag
-    
-    if is_final:
-        resp.headers["Cache-Control"] = "public, max-age=3600"
-    else:
-        resp.headers["Cache-Control"] = "public, max-age=8, stale-while-revalidate=20"
-    
-    return resp
+class SnapshotRing:
+    """Last few poll snapshots per game, keyed by ETag, for delta responses."""
+    def __init__(self, per_game=8, max_games=256):
+        self.per_game = per_game
+        self.max_games = max_games
+        self._games = OrderedDict()  # game_id -> OrderedDict(etag -> slim)
+        self._lock = threading.Lock()
 
-# Cleanup task - run periodically to prevent memory bloat
-def cleanup_cache():
-    while True:
-        time.sleep(300)  # Every 5 minutes
-        CACHE.cleanup(max_age=7200)  # Remove entries older than 2 hours
+    def record(self, game_id, etag, slim):
+        with self._lock:
+            ring = self._games.get(game_id)
+            if ring is None:
+                ring = self._games[game_id] = OrderedDict()
+                if len(self._games) > self.max_games:
+                    self._games.popitem(last=False)
+            self._games.move_to_end(game_id)
+            if etag in ring:
+                return
+            ring[etag] = slim
+            if len(ring) > self.per_game:
+                ring.popitem(last=False)
+
+    def get(self, game_id, etag):
+        with self._lock:
+            ring = self._games.get(game_id)
+            return ring.get(etag) if ring else None
 
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=cleanup_cache, daemon=True)
-cleanup_thread.start()
+SNAPSHOTS = SnapshotRing()
+
+# Optimized poll endpoint
+@app.get("/poll/game/<game_id>")
+def poll_game(game_id):
+    """
+    Slim payload with ETag/304 support. The slim dict, ETag and body are
+    built once per boxscore version and shared by every request.
+    Cache headers follow the game's cache policy (immutable once final).
+    With ?delta=1 and an If-None-Match ETag the server still knows, only the
+    fields that changed since that snapshot are returned ("delta": true).
+    """
+    try:
+        url = CDN_BOXSCORE.format(gid=game_id)
+        box, from_cache = fetch_json_throttled(f"box:{game_id}", url, ttl=10, check_final=True)
+    except Exception as e:
+        return jsonify({"error": "upstream_boxscore_failed", "gameId": game_id, "detail": str(e)}), 502
+
+    view = cached_view(f"box:{game_id}", "poll", box, lambda data: poll_view(game_id, data))
+    slim, etag = view["slim"], view["etag"]
+
+    if slim["status"] is None:
+        return view_response(view, "public, max-age=8")
+
+    cache_control = game_policy(game_id).cache_control
+    SNAPSHOTS.record(game_id, etag, slim)
+
+    known = client_etags()
+    if etag in known:
+        return view_response(view, cache_control)
+
+    if known and request.args.get("delta") in ("1", "true"):
+        base_etag = next(iter(known))
+        base = SNAPSHOTS.get(game_id, base_etag)
+        if base is not None:
+            resp = make_response(jsonify(diff_poll_snapshots(base, slim, base_etag)), 200)
+            resp.headers["ETag"] = etag
+            # A delta only makes sense relative to the client's own base
+            resp.headers["Cache-Control"] = "no-store"
+            resp.headers["Vary"] = "If-None-Match"
+            return resp
+
+    return view_response(view, cache_control)
+
+@app.get("/stream/game/<game_id>")
+def stream_game(game_id):
+    """
+    Server-Sent Events for one game, fed by a single shared poller:
+      snapshot  full slim payload (+ pbp high-water mark) on connect
+      poll      changed status/scores/players, same shape as ?delta=1 polls
+      pbp       new/edited/removed actions, same shape as /pbp?after=
+      end       game is final; the stream closes
+    Reconnects with Last-Event-ID replay what was missed when possible.
+    Each open stream holds a worker thread, so past STREAM_MAX_SUBSCRIBERS
+    open streams the answer is 503 + Retry-After (clients fall back to
+    /poll). A final game gets 204, which stops EventSource reconnecting.
+    """
+    # Through the cache (and archive), not just this worker's memory: the
+    # boxscore may have been evicted or only ever fetched by another worker
+    try:
+        box, _ = fetch_json_throttled(f"box:{game_id}", CDN_BOXSCORE.format(gid=game_id), ttl=10, check_final=True)
+    except Exception:
+        box = None  # The poller retries; a failed check isn't a reason to refuse
+    if cache_policy.game_state(cache_policy.game_facts(box)) == "final":
+        return Response(status=204)
+    if STREAMS.full():
+        resp = make_response(jsonify({"error": "too_many_streams", "gameId": game_id,
+                                      "detail": "use /poll/game/<id> instead"}), 503)
+        resp.headers["Retry-After"] = "60"
+        return resp
+
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+
+    resp = Response(stream_with_context(STREAMS.events(game_id, last_id)), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # Don't let proxies buffer the stream
+    return resp
 
 # ---------------- boot ----------------
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+# snapshot.py - save the hot cache to local disk and restore it at boot
+#
+# A deploy or restart otherwise starts with an empty cache. Entries keep
+# their original timestamps, so a restored copy is only served while its
+# TTL allows; past that it still carries its ETag/Last-Modified and is
+# revalidated with a cheap conditional GET instead of a full download.
+import os
+import gzip
+import time
+import zlib
+import tempfile
+
+import codec
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 6 * 3600))  # Ignore older snapshots
+
+def snapshot_path():
+    """SNAPSHOT_PATH, else the temp dir (which only survives in-place restarts,
+    not a deploy: render.yaml points it at the persistent disk)."""
+    return os.environ.get("SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "nba_cache_snapshot.json.gz"))
+
+def save(cache, path, meta=None):
+    """Write cache.export() (plus a small meta dict) to path atomically.
+    Returns the entry count."""
+    entries = cache.export()
+    snap = {"format": SNAPSHOT_FORMAT, "saved": time.time(), "meta": meta or {}, "entries": entries}
+    blob = gzip.compress(codec.dumps(snap), 5)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)  # Several workers may save; the last one wins
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return len(entries)
+
+def restore(cache, path, max_age=SNAPSHOT_MAX_AGE):
+    """Load a snapshot into cache. Returns (entries restored, meta); (0, {})
+    when the file is missing, too old, unreadable or another format."""
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            return 0, {}
+        with open(path, "rb") as f:
+            snap = codec.loads(gzip.decompress(f.read()))
+    except (OSError, EOFError, zlib.error, ValueError):
+        return 0, {}
+    if snap.get("format") != SNAPSHOT_FORMAT or time.time() - snap.get("saved", 0) > max_age:
+        return 0, {}
+    for e in snap["entries"]:
+        cache.set(e["key"], e["data"], e["final"], e["validators"], e["live"], ts=e["ts"])
+    return len(snap["entries"]), snap.get("meta") or {}
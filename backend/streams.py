@@ -0,0 +1,186 @@
+# streams.py - Server-Sent Events fan-out for server.py
+import time
+import queue
+import threading
+from collections import deque
+
+import codec
+
+class Subscriber:
+    """One connected client: a bounded queue of pre-formatted SSE frames."""
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = False
+
+def format_event(seq, name, data):
+    payload = codec.dumps(data).decode()
+    return f"id: {seq}\nevent: {name}\ndata: {payload}\n\n"
+
+class Channel:
+    """
+    One upstream poller shared by every subscriber of a key (e.g. a game).
+    poll(key, state) -> (state, [(event_name, data), ...], done) is called
+    every `interval` seconds while anyone is subscribed; snapshot(state)
+    -> (event_name, data) describes the current state for new clients.
+    """
+    def __init__(self, hub, key):
+        self.hub = hub
+        self.key = key
+        self.state = None
+        # Ids keep increasing across channel restarts, so a Last-Event-ID from
+        # an earlier poller never matches this channel's backlog by accident
+        self.seq = int(time.time() * 1000)
+        self.done = False
+        self.backlog = deque(maxlen=hub.backlog)  # (seq, frame) for Last-Event-ID replay
+        self.subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"stream-{key}", daemon=True)
+
+    def _publish(self, name, data):
+        """Format once, then hand the same frame to every subscriber."""
+        with self._lock:
+            self.seq += 1
+            frame = format_event(self.seq, name, data)
+            self.backlog.append((self.seq, frame))
+            for sub in list(self.subscribers):
+                try:
+                    sub.queue.put_nowait(frame)
+                except queue.Full:
+                    # Slow client: cut it loose rather than buffer without bound.
+                    # EventSource reconnects with Last-Event-ID and catches up.
+                    sub.dropped = True
+                    self.subscribers.discard(sub)
+                    self.hub._dropped += 1
+
+    def _close_all(self):
+        with self._lock:
+            for sub in self.subscribers:
+                sub.dropped = True
+            self.subscribers.clear()
+
+    def _idle(self):
+        """Retire the channel once nobody is listening (atomically with
+        StreamHub._subscribe, so no client attaches to a dead poller)."""
+        with self.hub._lock, self._lock:
+            if self.subscribers:
+                return False
+            self.done = True
+            self.hub._remove(self)
+            return True
+
+    def _run(self):
+        while not self._idle():
+            try:
+                self.state, events, done = self.hub.poll(self.key, self.state)
+            except Exception:
+                events, done = [], False
+            for name, data in events:
+                self._publish(name, data)
+            if done:
+                self._publish("end", {"key": self.key})
+                with self.hub._lock:
+                    self.done = True
+                    self.hub._remove(self)
+                self._close_all()
+                return
+            time.sleep(self.hub.interval)
+
+    def attach(self, last_event_id):
+        """Register a subscriber and queue what it missed: the replayable
+        backlog after last_event_id, or else a snapshot of the current state."""
+        sub = Subscriber(self.hub.queue_size)
+        with self._lock:
+            replay = None
+            if (last_event_id is not None and self.backlog
+                    and self.backlog[0][0] <= last_event_id + 1 <= self.seq + 1):
+                replay = [frame for seq, frame in self.backlog if seq > last_event_id]
+            if replay is not None:
+                for frame in replay[-self.hub.queue_size:]:
+                    sub.queue.put_nowait(frame)
+            elif self.state is not None:
+                name, data = self.hub.snapshot(self.state)
+                sub.queue.put_nowait(format_event(self.seq, name, data))
+            self.subscribers.add(sub)
+        return sub
+
+    def detach(self, sub):
+        with self._lock:
+            self.subscribers.discard(sub)
+
+class StreamHub:
+    """Channels keyed by id; a channel (and its poller thread) lives while it has subscribers.
+    Each open stream ties up a server thread, so at most max_subscribers are
+    served at once (a soft cap: checked with full() before a stream starts)."""
+    def __init__(self, poll, snapshot, interval=3.0, heartbeat=15.0, backlog=64, queue_size=64,
+                 max_subscribers=8):
+        self.poll = poll
+        self.snapshot = snapshot
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._channels = {}
+        self._dropped = 0
+        self._rejected = 0
+        self._open = 0  # Running events() generators, i.e. threads held by streams
+        self._lock = threading.Lock()
+
+    def _remove(self, channel):
+        # Caller holds self._lock
+        if self._channels.get(channel.key) is channel:
+            del self._channels[channel.key]
+
+    def _subscribe(self, key, last_event_id):
+        with self._lock:
+            channel = self._channels.get(key)
+            start = channel is None or channel.done
+            if start:
+                channel = self._channels[key] = Channel(self, key)
+            sub = channel.attach(last_event_id)
+        if start:
+            channel._thread.start()
+        return channel, sub
+
+    def full(self):
+        """True (and counted as a rejection) when no more streams should be opened."""
+        with self._lock:
+            if self._open < self.max_subscribers:
+                return False
+            self._rejected += 1
+            return True
+
+    def events(self, key, last_event_id=None):
+        """Generator of SSE frames for one client, with heartbeats while idle."""
+        channel, sub = self._subscribe(key, last_event_id)
+        with self._lock:
+            self._open += 1
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while True:
+                try:
+                    frame = sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    if sub.dropped:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield frame
+                if sub.dropped and sub.queue.empty():
+                    return
+        finally:
+            channel.detach(sub)
+            with self._lock:
+                self._open -= 1
+
+    def stats(self):
+        with self._lock:
+            channels = list(self._channels.values())
+        return {
+            "channels": len(channels),
+            "subscribers": sum(len(c.subscribers) for c in channels),
+            "dropped_subscribers": self._dropped,
+            "open_streams": self._open,
+            "rejected_subscribers": self._rejected,
+            "max_subscribers": self.max_subscribers,
+        }
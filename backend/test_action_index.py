@@ -0,0 +1,117 @@
+# test_action_index.py - ActionIndex cursors (python -m pytest test_action_index.py)
+from action_index import ActionIndex
+
+def doc(*actions):
+    return {"game": {"actions": [dict(a) for a in actions]}}
+
+def act(num, desc="", **extra):
+    return {"actionNumber": num, "description": desc or f"play {num}", **extra}
+
+def nums(inc):
+    return [a["actionNumber"] for a in inc["actions"]]
+
+def test_new_client_gets_everything_and_a_cursor():
+    index = ActionIndex()
+    index.update(doc(act(1), act(2), act(3)))
+    inc = index.since(0)
+    assert inc["reset"] is True
+    assert nums(inc) == [1, 2, 3]
+    assert inc["hwm"] == 3
+    assert index.since(inc["rev"]) == {"rev": inc["rev"], "hwm": 3, "actions": [], "removed": []}
+
+def test_new_actions_after_cursor():
+    index = ActionIndex()
+    index.update(doc(act(1), act(2)))
+    rev = index.since(0)["rev"]
+    index.update(doc(act(1), act(2), act(3), act(4)))
+    inc = index.since(rev)
+    assert nums(inc) == [3, 4]
+    assert inc["rev"] > rev
+
+def test_edit_is_sent_once_then_caught_up():
+    index = ActionIndex()
+    index.update(doc(*(act(n) for n in range(1, 11))))
+    rev = index.since(0)["rev"]
+    index.update(doc(*(act(n, "corrected" if n == 5 else "") for n in range(1, 11))))
+    inc = index.since(rev)
+    assert nums(inc) == [5]
+    assert inc["actions"][0]["description"] == "corrected"
+    # A caught-up client (the regression: it got #5 back on every poll)
+    for _ in range(3):
+        assert index.since(inc["rev"])["actions"] == []
+
+def test_late_insert_below_highest_action():
+    index = ActionIndex()
+    index.update(doc(act(1), act(2), act(10)))
+    rev = index.since(0)["rev"]
+    index.update(doc(act(1), act(2), act(5), act(10)))
+    inc = index.since(rev)
+    assert nums(inc) == [5]
+    assert index.since(inc["rev"])["actions"] == []
+
+def test_removal():
+    index = ActionIndex()
+    index.update(doc(act(1), act(2), act(3)))
+    rev = index.since(0)["rev"]
+    index.update(doc(act(1), act(3)))
+    inc = index.since(rev)
+    assert inc["actions"] == []
+    assert inc["removed"] == [2]
+    assert index.since(inc["rev"])["removed"] == []
+    assert nums(index.since(0)) == [1, 3]
+
+def test_removed_then_readded():
+    index = ActionIndex()
+    index.update(doc(act(1), act(2)))
+    rev = index.since(0)["rev"]
+    index.update(doc(act(1)))
+    index.update(doc(act(1), act(2, "back")))
+    inc = index.since(rev)
+    assert nums(inc) == [2] and inc["removed"] == []
+
+def test_same_document_is_a_no_op():
+    index = ActionIndex()
+    data = doc(act(1))
+    assert index.update(data) is True
+    rev = index.rev
+    assert index.update(data) is False
+    assert index.update(doc(act(1))) is True  # Equal content, new document
+    assert index.rev == rev
+
+def test_cursor_from_another_index_resets():
+    old = ActionIndex()
+    old.update(doc(act(1)))
+    stale_cursor = old.since(0)["rev"]
+    index = ActionIndex()
+    index.update(doc(act(1), act(2)))
+    inc = index.since(stale_cursor)
+    assert inc["reset"] is True and nums(inc) == [1, 2]
+
+def test_cursor_from_another_worker_resets():
+    # Two workers' indexes for the same game, built moments apart: a client
+    # caught up on one must get the full list from the other, not []
+    a, b = ActionIndex(), ActionIndex()
+    a.update(doc(*(act(n) for n in range(1, 11))))
+    for n in range(11, 16):
+        b.update(doc(*(act(i) for i in range(1, n + 1))))
+    cursor = b.since(0)["rev"]
+    for n in range(11, 21):
+        a.update(doc(*(act(i) for i in range(1, n + 1))))
+    inc = a.since(cursor)
+    assert inc["reset"] is True and nums(inc) == list(range(1, 21))
+
+def test_malformed_cursor_resets():
+    index = ActionIndex()
+    index.update(doc(act(1)))
+    for cursor in ("", "nonsense", f"{index.epoch}:x", f"{index.epoch}:{index.rev + 1}", None):
+        assert index.since(cursor)["reset"] is True
+
+def test_compaction_keeps_cursors_valid():
+    index = ActionIndex()
+    index.update(doc(act(1), act(2)))
+    rev = index.since(0)["rev"]
+    for i in range(200):
+        index.update(doc(act(1, f"edit {i}"), act(2)))
+    assert len(index._changes) <= 2 * 2 + 64
+    inc = index.since(rev)
+    assert nums(inc) == [1] and inc["actions"][0]["description"] == "edit 199"
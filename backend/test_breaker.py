@@ -0,0 +1,143 @@
+# test_breaker.py - CircuitBreaker / UpstreamGuard transitions (python -m pytest test_breaker.py)
+import pytest
+
+import breaker
+import prefetch
+from breaker import CircuitBreaker, UpstreamGuard, UpstreamUnavailable, CLOSED, OPEN, HALF_OPEN
+
+class FakeClock:
+    """Stands in for the time module in breaker.py and prefetch.py."""
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(breaker, "time", fake)
+    monkeypatch.setattr(prefetch, "time", fake)
+    return fake
+
+def trip(b):
+    for _ in range(b.failures):
+        b.failure()
+
+def test_opens_after_consecutive_failures(clock):
+    b = CircuitBreaker(failures=3, cooldown=10)
+    b.failure(); b.failure()
+    b.success()  # Resets the streak
+    b.failure(); b.failure()
+    assert b.state == CLOSED and b.allow()
+    b.failure()
+    assert b.state == OPEN
+    assert not b.allow() and b.rejected == 1
+
+def test_half_open_lets_one_probe_through(clock):
+    b = CircuitBreaker(failures=1, cooldown=10)
+    trip(b)
+    clock.now += 9.9
+    assert not b.allow()
+    clock.now += 0.1
+    assert b.allow() and b.state == HALF_OPEN
+    assert not b.allow()  # Probe still in flight
+    b.success()
+    assert b.state == CLOSED and b.allow() and b.allow()
+
+def test_failed_probe_doubles_cooldown_up_to_max(clock):
+    b = CircuitBreaker(failures=1, cooldown=10, max_cooldown=30)
+    trip(b)
+    for expected in (20, 30, 30):
+        clock.now = b.retry_at
+        assert b.allow()
+        b.failure()
+        assert b.state == OPEN and b.retry_at - clock.now == expected
+    clock.now = b.retry_at
+    assert b.allow()
+    b.success()
+    assert b.cooldown == 10  # Back to the base cooldown once closed
+
+def test_retry_after_extends_cooldown_within_max(clock):
+    b = CircuitBreaker(failures=1, cooldown=10, max_cooldown=120)
+    b.failure(retry_after=45)
+    assert b.retry_at - clock.now == 45
+    clock.now = b.retry_at
+    b.allow()
+    b.failure(retry_after=600)
+    assert b.retry_at - clock.now == 120
+    clock.now = b.retry_at
+    b.allow()
+    b.success()
+    b.failure(retry_after=2)  # Shorter than the cooldown: the cooldown wins
+    assert b.retry_at - clock.now == 10
+
+def test_failures_from_calls_in_flight_when_opened_are_ignored(clock):
+    b = CircuitBreaker(failures=1, cooldown=10)
+    trip(b)
+    retry_at = b.retry_at
+    clock.now += 5
+    b.failure()
+    assert b.retry_at == retry_at and b.opens == 1
+
+def test_guard_counts_429_and_5xx_not_404(clock):
+    guard = UpstreamGuard(failures=2, cooldown=10)
+    guard.record("box", 404)
+    guard.record("box", 403)
+    guard.record("box", 200)
+    assert guard.states() == {"box": 0}
+    guard.record("box", None)
+    guard.record("box", 429, retry_after=30)  # Retry-After of the failure that opens it counts
+    assert guard.states() == {"box": 2}
+    with pytest.raises(UpstreamUnavailable, match="circuit open"):
+        guard.reserve("box")
+    assert guard.breaker("box").retry_at - clock.now == 30
+    guard.reserve("pbp")  # Other families are unaffected
+
+def test_budget_refusal_releases_half_open_probe(clock):
+    guard = UpstreamGuard(rate=0.05, burst=1, failures=1, cooldown=10)
+    guard.record("box", 500)
+    guard.reserve("pbp")  # Spend the only token (10s of cooldown refill half of one)
+    clock.now = guard.breaker("box").retry_at
+    with pytest.raises(UpstreamUnavailable, match="budget"):
+        guard.reserve("box")  # Took the probe, then found no token
+    assert guard.throttled == 1
+    assert guard.breaker("box").state == HALF_OPEN
+    clock.now += 10
+    assert guard.reserve("box") == 0  # The probe slot came back
+
+def test_reserve_borrows_within_wait(clock):
+    guard = UpstreamGuard(rate=10.0, burst=2)
+    assert guard.reserve("box") == 0
+    assert guard.reserve("box") == 0
+    assert guard.reserve("box", wait=1) == pytest.approx(0.1)
+    assert guard.reserve("box", wait=1) == pytest.approx(0.2)  # In line behind the previous one
+    with pytest.raises(UpstreamUnavailable):
+        guard.reserve("box", wait=0.25)
+    assert guard.reserve("box", wait=1) == pytest.approx(0.3)  # The refusal spent nothing
+    assert (guard.throttled, guard.delayed) == (1, 3)
+
+def test_acquire_sleeps_for_its_reservation(clock):
+    guard = UpstreamGuard(rate=4.0, burst=1)
+    assert guard.acquire("box") == 0
+    assert guard.acquire("box", wait=1) == pytest.approx(0.25)
+    assert clock.slept == [pytest.approx(0.25)]
+
+def test_family_budgets_are_separate(clock):
+    guard = UpstreamGuard(rate=1.0, burst=1, budgets={"asset": (1.0, 2)})
+    guard.reserve("asset"); guard.reserve("asset")
+    assert guard.reserve("box") == 0
+    with pytest.raises(UpstreamUnavailable):
+        guard.reserve("asset")
+
+def test_take_never_borrows(clock):
+    bucket = prefetch.TokenBucket(rate=1.0, capacity=3)
+    assert bucket.take(2) and not bucket.take(2)
+    assert bucket.tokens == 1
+    clock.now += 1
+    assert bucket.take(2) and bucket.tokens == 0
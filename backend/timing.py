@@ -0,0 +1,86 @@
+# timing.py - Server-Timing phases per request, and opt-in cProfile sampling
+#
+# Code on the request path wraps its work in `with timing.phase("parse"):`;
+# the durations are summed per phase and sent back as
+#   Server-Timing: cdn;dur=41.2, parse;dur=3.1, encode;dur=0.8, total;dur=47.9
+# Outside a request (background refreshes, prefetch) phases cost nothing.
+import io
+import time
+import random
+import pstats
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+@contextmanager
+def phase(name):
+    if not has_request_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
+
+def add(name, seconds):
+    """Add seconds to a phase of the current request."""
+    if has_request_context():
+        phases = g.setdefault("timing_phases", {})
+        phases[name] = phases.get(name, 0.0) + seconds
+
+def header(total):
+    """Server-Timing value for the current request's phases plus total (seconds)."""
+    phases = dict(g.get("timing_phases") or {})
+    phases["total"] = total
+    return ", ".join(f"{name};dur={secs * 1000:.1f}" for name, secs in phases.items())
+
+class Profiler:
+    """
+    Runs cProfile on sampled requests (sample_rate, or on demand) and keeps
+    the last `keep` profiles with their top functions by cumulative time.
+    cProfile can only profile one request at a time per process; requests
+    arriving while one is being profiled are simply not profiled.
+    """
+    def __init__(self, sample_rate=0.0, keep=20, top=25):
+        self.sample_rate = sample_rate
+        self.top = top
+        self.profiles = deque(maxlen=keep)
+        self._busy = threading.Lock()
+
+    def start(self, forced=False):
+        """Start profiling this request if sampled; returns the profile or None."""
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # Another profiler is active
+            self._busy.release()
+            return None
+        return prof
+
+    def finish(self, prof, route, path, seconds):
+        prof.disable()
+        self._busy.release()
+        stats = pstats.Stats(prof, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        self.profiles.append({
+            "route": route,
+            "path": path,
+            "ms": round(seconds * 1000, 2),
+            "at": time.time(),
+            "top": [
+                {"function": f"{fn}:{line}({name})", "calls": nc, "tottime_ms": round(tt * 1000, 3),
+                 "cumtime_ms": round(ct * 1000, 3)}
+                for (fn, line, name), (cc, nc, tt, ct, callers) in rows
+            ],
+        })
+
+    def snapshot(self):
+        return list(self.profiles)
@@ -0,0 +1,118 @@
+# upstream_async.py - asyncio/aiohttp client for fetching many CDN documents at once
+#
+# One event loop on a daemon thread and one pooled aiohttp session serve
+# every batch, so fetching a whole slate costs one loop thread instead of a
+# thread per game. Blocking callers use fetch_many(), which returns one
+# result per request (partial results on timeout, never an all-or-nothing
+# failure).
+import time
+import atexit
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:  # Optional; server.py falls back to its thread pool
+    aiohttp = None
+
+RETRY_STATUSES = (500, 502, 503, 504)  # 429 is left to the caller's circuit breaker
+
+class UpstreamResult:
+    """Outcome of one request: status/headers/body, or error."""
+    __slots__ = ("status", "headers", "body", "error", "elapsed", "attempts")
+
+    def __init__(self, status=None, headers=None, body=None, error=None, elapsed=0.0, attempts=1):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.error = error
+        self.elapsed = elapsed
+        self.attempts = attempts
+
+class AsyncUpstream:
+    def __init__(self, headers, per_host=16, total=64, retries=2, backoff=0.3):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not installed")
+        self.headers = dict(headers)
+        self.per_host = per_host
+        self.total = total
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+        self._host_limits = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="upstream-async", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Close the pooled session (registered at exit)."""
+        if self._session is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(5)
+            self._session = None
+
+    def _host_limit(self, url):
+        """Per-host semaphore, on top of the connector's own per-host cap."""
+        host = urlsplit(url).netloc
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return sem
+
+    async def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.total, limit_per_host=self.per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self._session
+
+    async def _fetch(self, url, headers, timeout, delay=0.0):
+        if delay:
+            await asyncio.sleep(delay)  # Caller's rate-limit slot; counts against timeout
+            timeout -= delay
+        session = await self._get_session()
+        start = time.perf_counter()
+        deadline = start + timeout
+        attempt = 0
+        async with self._host_limit(url):
+            while True:
+                remaining = deadline - time.perf_counter()
+                try:
+                    async with session.get(url, headers=headers,
+                                           timeout=aiohttp.ClientTimeout(total=remaining)) as r:
+                        body = await r.read()
+                        status, resp_headers = r.status, r.headers.copy()  # Case-insensitive
+                except asyncio.TimeoutError:
+                    return UpstreamResult(error="timeout", elapsed=time.perf_counter() - start,
+                                          attempts=attempt + 1)
+                except aiohttp.ClientError as e:
+                    status, resp_headers, body = None, {}, None
+                    error = str(e) or e.__class__.__name__
+                else:
+                    error = None
+                    if status not in RETRY_STATUSES:
+                        return UpstreamResult(status, resp_headers, body, elapsed=time.perf_counter() - start,
+                                              attempts=attempt + 1)
+
+                delay = self.backoff * (2 ** attempt)
+                if attempt >= self.retries or time.perf_counter() + delay >= deadline:
+                    return UpstreamResult(status, resp_headers, body, error=error,
+                                          elapsed=time.perf_counter() - start, attempts=attempt + 1)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _gather(self, requests, timeout):
+        return await asyncio.gather(*(self._fetch(url, headers, timeout, *delay)
+                                      for url, headers, *delay in requests))
+
+    def fetch_many(self, requests, timeout=10):
+        """
+        requests: [(url, extra_headers), ...] or [(url, extra_headers, delay), ...]
+        to start a request `delay` seconds late. Every request gets its own
+        `timeout` budget (including the delay and retries); all run concurrently.
+        Returns UpstreamResults in the same order.
+        """
+        if not requests:
+            return []
+        fut = asyncio.run_coroutine_threadsafe(self._gather(requests, timeout), self._loop)
+        return fut.result(timeout + 5)
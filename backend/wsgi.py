@@ -0,0 +1,7 @@
+# wsgi.py - gunicorn entry point: gunicorn wsgi:app
+# Set CACHE_BACKEND=sqlite when running more than one worker so all workers
+# share one cache (and one upstream fetch per key) instead of N copies.
+from server import app
+
+if __name__ == "__main__":
+    app.run()
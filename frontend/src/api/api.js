@@ -28,6 +28,12 @@ export async function getGameIdsForDate(dateISO /* 'YYYY-MM-DD' */) {
   return data; // { date, gameIds: [...] }
 }
 
+// GET /scoreboard?date=YYYY-MM-DD&cards=1 -> { date, gameIds, games: [card...] }
+export async function getGameCardsForDate(dateISO /* 'YYYY-MM-DD' */) {
+  const { data } = await http.get("/scoreboard", { params: { date: dateISO, cards: 1 } });
+  return data; // { date, gameIds: [...], games: [{ gameId, statusText, home, away, ... }] }
+}
+
 // ---------- GAME DATA ----------
 
 // GET /game/:gameId/boxscore  (raw boxscore JSON)
@@ -36,18 +42,38 @@ export async function getBoxscore(gameId) {
   return data; // { game: {...}, meta: {...} }
 }
 
+// GET /game/:gameId/dashboard  (boxscore + pbp, normalized server-side)
+export async function getDashboard(gameId) {
+  const { data } = await http.get(`/game/${gameId}/dashboard`);
+  return data; // { meta, teams: { home, away }, playByPlay, pbpRev }
+}
+
 // GET /game/:gameId/pbp  (raw play-by-play JSON)
 export async function getPlayByPlay(gameId) {
   const { data } = await http.get(`/game/${gameId}/pbp`);
   return data; // { game: { actions: [...] }, meta: {...} }
 }
 
+// GET /game/:gameId/pbp?after=REV  -> actions added/edited/removed since cursor REV
+// (REV is the `rev` of the previous response, or the dashboard's pbpRev;
+// an unknown cursor, e.g. from another server worker, gets the full list with reset)
+export async function getPlayByPlaySince(gameId, after) {
+  const { data } = await http.get(`/game/${gameId}/pbp`, { params: { after } });
+  return data; // { gameId, after, rev, hwm, actions: [...], removed: [actionNumber, ...], reset? }
+}
+
 // ---------- POLL (ETag-aware) ----------
 // GET /poll/game/:gameId  -> slim snapshot with ETag (304 when unchanged)
+// With delta=1 the server answers with only the changed fields ({ delta: true, ... })
+// when it still remembers prevEtag; merging code treats missing fields as unchanged.
 export async function pollGame(gameId, prevEtag /* string or undefined */) {
   const headers = prevEtag ? { "If-None-Match": prevEtag } : {};
   try {
-    const res = await http.get(`/poll/game/${gameId}`, { headers, validateStatus: () => true });
+    const res = await http.get(`/poll/game/${gameId}`, {
+      headers,
+      params: { delta: 1 },
+      validateStatus: () => true,
+    });
     if (res.status === 304) {
       return { status: 304, etag: prevEtag, data: null };
     }
@@ -62,10 +88,20 @@ export async function pollGame(gameId, prevEtag /* string or undefined */) {
   }
 }
 
-// ---------- ASSETS (redirect helpers) ----------
-// These routes 302 to the actual CDN assets, so you can use them directly in <img src="...">
+// ---------- ASSETS ----------
+// The server keeps local copies of logos/headshots (strong ETags, cached
+// immutable), so these URLs can go straight into <img src="...">.
+
+// The 30 franchises share one sprite; "#team-<id>" picks a single logo,
+// so a page of game cards makes one logo request instead of one per team.
+const FIRST_TEAM_ID = 1610612737;
+const LAST_TEAM_ID = 1610612766;
 
 export function getTeamLogoUrl(teamId) {
+  const id = Number(teamId);
+  if (id >= FIRST_TEAM_ID && id <= LAST_TEAM_ID) {
+    return `${SERVER_BASE_URL}/assets/team-logos.svg#team-${id}`;
+  }
   return `${SERVER_BASE_URL}/assets/team-logo/${teamId}`;
 }
 
@@ -74,6 +110,12 @@ export function getPlayerHeadshotUrl(playerId, size = "260x190") {
   return `${SERVER_BASE_URL}/assets/player-headshot/${playerId}`;
 }
 
+// GET /assets/player-headshots?game=:gameId -> every player's headshot as a data: URI
+export async function getHeadshotManifest(gameId) {
+  const { data } = await http.get("/assets/player-headshots", { params: { game: gameId } });
+  return data.headshots; // { "<playerId>": "data:image/png;base64,..." | null }
+}
+
 // ---------- HEALTH ----------
 
 export async function pingHealth() {
@@ -1,11 +1,12 @@
 // dataService.js
 import {
   getTodayScoreboard,
-  getGameIdsForDate,
-  getBoxscore,
-  getPlayByPlay,
+  getGameCardsForDate,
+  getDashboard,
+  getPlayByPlaySince,
   getTeamLogoUrl,
   getPlayerHeadshotUrl,
+  getHeadshotManifest,
   pollGame
 } from "./api";
 
@@ -40,127 +41,84 @@ export async function getGameCardData(dateISO) {
     }));
   }
 
-  // CASE B: Not today → get gameIds via schedule, then fetch boxscores
-  const { gameIds = [] } = await getGameIdsForDate(dateISO);
-  if (!gameIds.length) return [];
-
-  const boxes = await Promise.allSettled(gameIds.map(id => getBoxscore(id)));
-
-  return boxes
-    .filter(b => b.status === "fulfilled")
-    .map(b => b.value?.game)
-    .filter(Boolean)
-    .map(game => {
-      const h = game.homeTeam ?? {};
-      const a = game.awayTeam ?? {};
-      return {
-        gameId: game.gameId,
-        statusText: game.gameStatusText,    // "Final" or tip time
-        gameClock: game.gameClock ?? null,
-        period: (typeof game.period === "object" ? game.period?.current : game.period) ?? null,
-        startDate: dateISO,
-        arena: game?.arena?.arenaName ?? null,
-        city: game?.arena?.arenaCity ?? null,
-
-        home: {
-          teamId: h.teamId,
-          triCode: h.teamTricode,
-          score: h.score,
-          logo: getTeamLogoUrl(h.teamId),
-        },
-        away: {
-          teamId: a.teamId,
-          triCode: a.teamTricode,
-          score: a.score,
-          logo: getTeamLogoUrl(a.teamId),
-        },
-      };
-    });
+  // CASE B: Not today → server builds the cards in one call
+  const { games = [] } = await getGameCardsForDate(dateISO);
+  return games.map(card => ({
+    ...card,
+    home: { ...card.home, logo: getTeamLogoUrl(card.home.teamId) },
+    away: { ...card.away, logo: getTeamLogoUrl(card.away.teamId) },
+  }));
 }
 
 // ---------- Game dashboard (one-shot build) ----------
 export async function getDashboardData(gameId) {
-  // Grab raw boxscore + pbp
-  const [box, pbp] = await Promise.all([
-    getBoxscore(gameId),
-    getPlayByPlay(gameId).catch(() => null), // PBP might be empty pregame
-  ]);
-
-  const g = box?.game ?? {};
-  const h = g.homeTeam ?? {};
-  const a = g.awayTeam ?? {};
-  const actions = pbp?.game?.actions ?? [];
-
-  const normalizePlayers = team =>
-    (team.players ?? []).map(p => {
-      const s = p.statistics ?? {};
-      return {
-        playerId: p.personId,
-        jerseyNum: p.jerseyNum,
-        name: p.name,
-        position: p.position,
-        starter: p.starter === "1",
-        oncourt: p.oncourt === "1",
-        stats: {
-          pts: s.points,
-          reb: s.reboundsTotal ?? (s.rebounds || null),
-          ast: s.assists,
-          stl: s.steals,
-          blk: s.blocks,
-          tov: s.turnovers,
-          pf: s.foulsPersonal,
-          fgm: s.fieldGoalsMade, fga: s.fieldGoalsAttempted, fgPct: s.fieldGoalsPercentage,
-          ftm: s.freeThrowsMade, fta: s.freeThrowsAttempted, ftPct: s.freeThrowsPercentage,
-          tpm: s.threePointersMade, tpa: s.threePointersAttempted, tpPct: s.threePointersPercentage,
-          plusMinus: s.plusMinusPoints,
-          minutes: s.minutes ?? s.minutesCalculated,
-        },
-        headshot: getPlayerHeadshotUrl(p.personId),
-      };
-    });
+  // One round trip: the server merges boxscore + pbp and normalizes players.
+  // Headshots aren't waited for; see getDashboardHeadshots / addHeadshots.
+  const dash = await getDashboard(gameId);
 
-  const periodCurrent =
-    typeof g.period === "object" ? g.period?.current : g.period;
+  const withUrls = team => ({
+    ...team,
+    logo: getTeamLogoUrl(team.teamId),
+  });
 
   return {
-    meta: {
-      gameId,
-      statusText: g.gameStatusText,
-      gameClock: g.gameClock,
-      period: periodCurrent,
-      attendance: g.attendance,
-      arena: {
-        name: g?.arena?.arenaName,
-        city: g?.arena?.arenaCity,
-        state: g?.arena?.arenaState,
-        tz: g?.arena?.arenaTimezone,
-      },
+    ...dash,
+    teams: {
+      home: withUrls(dash.teams.home),
+      away: withUrls(dash.teams.away),
     },
+  };
+}
+
+// Every headshot of the game in one batch ({playerId: data URI}), or null
+export function getDashboardHeadshots(gameId) {
+  return getHeadshotManifest(gameId).catch(() => null);
+}
+
+// Fill in player headshots once the batch arrives; any it lacks (or all,
+// when it failed) load one by one. Unchanged players keep their objects.
+export function addHeadshots(dashboard, headshots) {
+  if (!dashboard?.teams) return dashboard;
+  const withHeadshots = team => ({
+    ...team,
+    players: (team.players ?? []).map(p => {
+      const headshot = headshots?.[p.playerId] ?? getPlayerHeadshotUrl(p.playerId);
+      return p.headshot === headshot ? p : { ...p, headshot };
+    }),
+  });
+  return {
+    ...dashboard,
     teams: {
-      home: {
-        teamId: h.teamId,
-        triCode: h.teamTricode,
-        score: h.score,
-        logo: getTeamLogoUrl(h.teamId),
-        periods: h.periods ?? [],
-        totals: h.statistics ?? {},
-        players: normalizePlayers(h),
-      },
-      away: {
-        teamId: a.teamId,
-        triCode: a.teamTricode,
-        score: a.score,
-        logo: getTeamLogoUrl(a.teamId),
-        periods: a.periods ?? [],
-        totals: a.statistics ?? {},
-        players: normalizePlayers(a),
-      },
+      home: withHeadshots(dashboard.teams.home),
+      away: withHeadshots(dashboard.teams.away),
     },
-    // Raw PBP so you can build lineups/timeline if you want
-    playByPlay: actions,
   };
 }
 
+// ---------- Incremental play-by-play merge ----------
+// Replace edited actions by actionNumber, drop removed ones, append new ones.
+// With inc.reset the server sent the complete list instead.
+// Returns null when nothing actually differs from the current actions.
+function mergePlayByPlay(actions, inc) {
+  if (!inc || (!inc.actions?.length && !inc.removed?.length && !inc.reset)) return null;
+  const same = (a, b) => a === b || JSON.stringify(a) === JSON.stringify(b);
+  const current = new Map((actions || []).map(a => [a.actionNumber, a]));
+  const byNum = inc.reset ? new Map() : new Map(current);
+  let changed = inc.reset && (inc.actions?.length ?? 0) !== current.size;
+  for (const n of inc.removed || []) changed = byNum.delete(n) || changed;
+  for (const a of inc.actions || []) {
+    const old = current.get(a.actionNumber);
+    if (old && same(old, a)) {
+      byNum.set(a.actionNumber, old); // Keep the existing object
+    } else {
+      byNum.set(a.actionNumber, a);
+      changed = true;
+    }
+  }
+  if (!changed) return null;
+  return [...byNum.values()].sort((a, b) => a.actionNumber - b.actionNumber);
+}
+
 // ---------- Immutable live update from /poll ----------
 /**
  * Immutably merge slim /poll payload into a dashboard object.
@@ -177,22 +135,35 @@ export async function getUpdatedDashboard(dashboard, gameId, prevEtag) {
     return { etag: res.etag, dashboard, changed: false, final: false, status: res.status };
   }
 
-  const res = await pollGame(gameId, prevEtag);
+  const [res, inc] = await Promise.all([
+    pollGame(gameId, prevEtag),
+    getPlayByPlaySince(gameId, dashboard.pbpRev ?? 0).catch(() => null),
+  ]);
+
+  // ---- new / edited plays ----
+  // The cursor always advances; only a real change in the plays counts as changed
+  const mergedPbp = mergePlayByPlay(dashboard.playByPlay, inc);
+  let withPbp = dashboard;
+  if (mergedPbp) {
+    withPbp = { ...dashboard, playByPlay: mergedPbp, pbpRev: inc.rev };
+  } else if (inc?.rev !== undefined && inc.rev !== dashboard.pbpRev) {
+    withPbp = { ...dashboard, pbpRev: inc.rev };
+  }
 
   // No change
   if (res.status === 304) {
-    return { etag: prevEtag, dashboard, changed: false, final: false, status: 304 };
+    return { etag: prevEtag, dashboard: withPbp, changed: !!mergedPbp, final: false, status: 304 };
   }
   // Error or empty data
   if (res.status !== 200 || !res.data) {
-    return { etag: res.etag, dashboard, changed: false, final: false, status: res.status };
+    return { etag: res.etag, dashboard: withPbp, changed: !!mergedPbp, final: false, status: res.status };
   }
 
   const slim = res.data;
-  let changed = false;
+  let changed = !!mergedPbp;
 
   // Clone shells
-  let next = { ...dashboard, meta: { ...dashboard.meta }, teams: { ...dashboard.teams } };
+  let next = { ...withPbp, meta: { ...withPbp.meta }, teams: { ...withPbp.teams } };
 
   // ---- status / clock / period ----
   if (slim.status) {
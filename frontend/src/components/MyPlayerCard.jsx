@@ -10,7 +10,7 @@ export default React.memo(function MyPlayerCard({ player }) {
   return (
     <div className="player-card">
       <div className="player-headshot">
-        {!imgError ? (
+        {player.headshot && !imgError ? (
           <img 
             src={player.headshot} 
             alt={player.name}
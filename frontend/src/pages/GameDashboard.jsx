@@ -1,6 +1,6 @@
-import React, { useEffect, useState, useMemo, useCallback } from "react";
+import React, { useEffect, useState, useMemo, useCallback, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
-import { getDashboardData, getUpdatedDashboard } from "../api/data";
+import { getDashboardData, getDashboardHeadshots, addHeadshots, getUpdatedDashboard } from "../api/data";
 import MyDashboardHeader from "../components/MyDashboardHeader";
 import MyScoreboard from "../components/MyScoreboard";
 import MyPlayerList from "../components/MyPlayerList";
@@ -43,6 +43,17 @@ export default function GameDashboard() {
   const [dashboardData, setDashboardData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [err, setErr] = useState(false);
+  // ETag of the last /poll response, sent back as If-None-Match (304s and deltas)
+  const pollEtagRef = useRef(undefined);
+  // Latest dashboard for the poller, which must not restart on every update
+  const dashboardRef = useRef(null);
+  // Headshot batch once it has arrived (null if it failed), so poll updates keep it
+  const headshotsRef = useRef(undefined);
+  const hasData = !!dashboardData;
+
+  useEffect(() => {
+    dashboardRef.current = dashboardData;
+  }, [dashboardData]);
 
   // Memoized retry handler
   const handleRetry = useCallback(() => {
@@ -62,9 +73,13 @@ export default function GameDashboard() {
     let ignore = false;
 
     (async () => {
+      // Requested alongside the dashboard, but the first render doesn't wait for it
+      const headshots = getDashboardHeadshots(gameId);
       try {
         setLoading(true);
         setErr(false);
+        pollEtagRef.current = undefined;
+        headshotsRef.current = undefined;
 
         const data = await getDashboardData(gameId);
 
@@ -76,11 +91,18 @@ export default function GameDashboard() {
           console.error("[GameDashboard] Initial load error", e);
           setErr(true);
         }
+        return;
       } finally {
         if (!ignore) {
           setLoading(false);
         }
       }
+
+      const manifest = await headshots;
+      if (!ignore) {
+        headshotsRef.current = manifest;
+        setDashboardData(prev => addHeadshots(prev, manifest));
+      }
     })();
 
     return () => {
@@ -90,7 +112,7 @@ export default function GameDashboard() {
 
   // Poll every 15s AFTER each request finishes (no overlaps)
   useEffect(() => {
-    if (!gameId || !dashboardData) return;
+    if (!gameId || !hasData) return;
 
     let stopped = false;
     let timerId = null;
@@ -101,11 +123,17 @@ export default function GameDashboard() {
       inFlight = true;
 
       try {
-        const res = await getUpdatedDashboard(dashboardData, gameId, undefined);
+        const res = await getUpdatedDashboard(dashboardRef.current, gameId, pollEtagRef.current);
         if (stopped) return;
-
-        if (res?.status === 200 && res?.changed) {
-          setDashboardData(res.dashboard);
+        if (res?.etag) pollEtagRef.current = res.etag;
+
+        // changed can also come from new plays while the boxscore poll was a 304
+        if (res?.changed) {
+          // The poll may have started before the headshots were added
+          const manifest = headshotsRef.current;
+          setDashboardData(manifest === undefined ? res.dashboard : addHeadshots(res.dashboard, manifest));
+        } else if (res?.dashboard) {
+          dashboardRef.current = res.dashboard; // Only the pbp cursor moved; no re-render
         }
 
         if (res?.final) {
@@ -130,7 +158,7 @@ export default function GameDashboard() {
       stopped = true;
       if (timerId) clearTimeout(timerId);
     };
-  }, [gameId, dashboardData]);
+  }, [gameId, hasData]);
 
   // Memoized derived data
   const { headerData, scoreboardData, playerListData, pbpData, homeTeamId } = useMemo(() => {